@@ -1,7 +1,16 @@
-from .pollinations_nodes import PollinationsImageGen, PollinationsTextGen, PollinationsVideoGen, PollinationsAudioGen, PollinationsBYOPLogin
+import time
+_import_start = time.perf_counter()
+
+from .pollinations_nodes import PollinationsImageGen, PollinationsImageBatchGen, PollinationsTextGen, PollinationsVideoGen, PollinationsAudioGen, PollinationsBYOPLogin
+
+from .pollinations_catalog import record_import_time
+_import_seconds = time.perf_counter() - _import_start
+record_import_time(_import_seconds)
+print(f"🌸 Pollinations BYOP loaded in {_import_seconds * 1000:.1f} ms (details: /pollinations/startup)")
 
 NODE_CLASS_MAPPINGS = {
     "PollinationsImageGen": PollinationsImageGen,
+    "PollinationsImageBatchGen": PollinationsImageBatchGen,
     "PollinationsTextGen": PollinationsTextGen,
     "PollinationsVideoGen": PollinationsVideoGen,
     "PollinationsAudioGen": PollinationsAudioGen,
@@ -10,6 +19,7 @@ NODE_CLASS_MAPPINGS = {
 
 NODE_DISPLAY_NAME_MAPPINGS = {
     "PollinationsImageGen": "🌸🖼️ Pollinations Image Gen (BYOP)",
+    "PollinationsImageBatchGen": "🌸🖼️ Pollinations Image Batch Gen (BYOP)",
     "PollinationsTextGen": "🌸🤖 Pollinations Text Gen (BYOP)",
     "PollinationsVideoGen": "🌸🎞️ Pollinations Video Gen URL (BYOP)",
     "PollinationsAudioGen": "🌸🔊 Pollinations Audio Gen (BYOP)",
@@ -0,0 +1,322 @@
+"""
+Local stand-in for the Pollinations API, used by the offline benchmarks.
+
+Serves the endpoints the extension talks to:
+
+- GET  /image/{prompt}          JPEG (or PNG) of the requested width x height
+- POST /v1/chat/completions     JSON reply, or an SSE stream when "stream": true
+- POST /upload                  multipart upload -> {"url": ...}
+- GET  /audio/{text}            WAV clip of --payload-kb
+- POST /api/device/code|token, GET /api/device/userinfo   BYOP device flow
+- GET  /text/models, /image/models, /audio/models         model lists (ETag aware)
+- GET  /__stats                 request / byte counters of this server
+
+Latency, payload size and failure injection are configurable, so the client
+side can be measured with and without a slow or unreliable upstream:
+
+    python benchmarks/mock_server.py --port 8189 --latency-ms 150 --rate-429 0.05
+
+Then point the extension at it with POLLINATIONS_GEN_BASE_URL,
+POLLINATIONS_MEDIA_BASE_URL and POLLINATIONS_ENTER_BASE_URL.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import random
+import struct
+import threading
+import time
+from collections import defaultdict
+
+from aiohttp import web
+
+DEFAULTS = {
+    "latency_ms": 0.0,        # added before every generation response (time to first byte)
+    "jitter_ms": 0.0,         # uniform extra latency on top
+    "token_interval_ms": 5.0, # delay between two SSE chunks
+    "text_tokens": 64,        # words per chat reply
+    "payload_kb": 256,        # audio clip size
+    "image_format": "jpeg",
+    "error_rate": 0.0,        # fraction of generation requests answered with 500
+    "rate_429": 0.0,          # fraction answered with 429 + Retry-After
+    "retry_after": 1,
+    "device_pending_polls": 1,  # device-token polls answered "authorization_pending"
+}
+
+MODELS = {
+    "text": [{"name": "openai", "description": "Mock text model", "output_modalities": ["text"]}],
+    "image": [{"name": "flux", "description": "Mock image model", "output_modalities": ["image"]},
+              {"name": "mock-video", "description": "Mock video model", "output_modalities": ["video"],
+               "paid_only": True}],
+    "audio": [{"name": "openai-audio", "description": "Mock audio model", "output_modalities": ["audio"],
+               "voices": ["alloy"]}],
+}
+
+
+class MockState:
+    """Settings plus counters shared by all handlers."""
+
+    def __init__(self, **settings):
+        self.settings = dict(DEFAULTS)
+        self.settings.update({k: v for k, v in settings.items() if v is not None})
+        self.requests = defaultdict(int)
+        self.statuses = defaultdict(int)
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self._images = {}
+        self._device_polls = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def count(self, route: str, status: int, sent: int = 0, received: int = 0):
+        with self._lock:
+            self.requests[route] += 1
+            self.statuses[str(status)] += 1
+            self.bytes_sent += sent
+            self.bytes_received += received
+
+    def stats(self):
+        with self._lock:
+            return {"requests": dict(self.requests), "statuses": dict(self.statuses),
+                    "bytes_sent": self.bytes_sent, "bytes_received": self.bytes_received}
+
+    def reset(self):
+        with self._lock:
+            self.requests.clear()
+            self.statuses.clear()
+            self.bytes_sent = self.bytes_received = 0
+
+    def image_bytes(self, width: int, height: int, seed: int) -> bytes:
+        """Encoded test image, rendered once per size (seed only varies the tint)."""
+        fmt = self.settings["image_format"]
+        key = (width, height, seed % 8, fmt)
+        body = self._images.get(key)
+        if body is None:
+            import numpy as np
+            from PIL import Image
+            rng = np.random.default_rng(seed % 8)
+            y, x = np.mgrid[0:height, 0:width]
+            pixels = np.stack([x * 255 // max(width - 1, 1), y * 255 // max(height - 1, 1),
+                               np.full_like(x, (seed % 8) * 32)], axis=-1)
+            pixels = (pixels + rng.integers(0, 24, pixels.shape)).clip(0, 255).astype(np.uint8)
+            out = io.BytesIO()
+            if fmt == "png":
+                Image.fromarray(pixels).save(out, format="PNG", compress_level=1)
+            else:
+                Image.fromarray(pixels).save(out, format="JPEG", quality=90)
+            body = self._images[key] = out.getvalue()
+        return body
+
+
+def wav_bytes(size: int, sample_rate: int = 24000) -> bytes:
+    """Silent 16-bit mono WAV of roughly `size` bytes."""
+    frames = max(size - 44, 2) // 2
+    data = bytes(frames * 2)
+    header = b"RIFF" + struct.pack("<I", 36 + len(data)) + b"WAVEfmt " + struct.pack(
+        "<IHHIIHH", 16, 1, 1, sample_rate, sample_rate * 2, 2, 16) + b"data" + struct.pack("<I", len(data))
+    return header + data
+
+
+async def _delay(state: MockState):
+    s = state.settings
+    latency = s["latency_ms"] + random.uniform(0, s["jitter_ms"])
+    if latency > 0:
+        await asyncio.sleep(latency / 1000.0)
+
+
+def _injected_failure(state: MockState, route: str):
+    """429 / 500 response when the dice say so, else None."""
+    s = state.settings
+    roll = random.random()
+    if roll < s["rate_429"]:
+        state.count(route, 429)
+        return web.json_response({"error": "rate limited (mock)"}, status=429,
+                                 headers={"Retry-After": str(s["retry_after"])})
+    if roll < s["rate_429"] + s["error_rate"]:
+        state.count(route, 500)
+        return web.json_response({"error": "internal error (mock)"}, status=500)
+    return None
+
+
+def build_app(state: MockState) -> web.Application:
+    routes = web.RouteTableDef()
+
+    @routes.get("/image/{prompt}")
+    async def image(request):
+        failure = _injected_failure(state, "image")
+        if failure is not None:
+            return failure
+        await _delay(state)
+        q = request.query
+        body = state.image_bytes(int(q.get("width", 1024)), int(q.get("height", 1024)), int(q.get("seed", 42)))
+        state.count("image", 200, sent=len(body))
+        ctype = "image/png" if state.settings["image_format"] == "png" else "image/jpeg"
+        return web.Response(body=body, content_type=ctype)
+
+    @routes.post("/v1/chat/completions")
+    async def chat(request):
+        payload = await request.json()
+        failure = _injected_failure(state, "chat")
+        if failure is not None:
+            return failure
+        await _delay(state)
+        model = payload.get("model", "openai")
+        words = [f"token{i}" for i in range(int(state.settings["text_tokens"]))]
+        if not payload.get("stream"):
+            body = json.dumps({"model": model, "choices": [
+                {"index": 0, "message": {"role": "assistant", "content": " ".join(words)}}]}).encode()
+            state.count("chat", 200, sent=len(body))
+            return web.Response(body=body, content_type="application/json")
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+        await response.prepare(request)
+        sent, interval = 0, state.settings["token_interval_ms"] / 1000.0
+        for i, word in enumerate(words):
+            chunk = {"choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}}]}
+            line = f"data: {json.dumps(chunk)}\n\n".encode()
+            await response.write(line)
+            sent += len(line)
+            if interval > 0:
+                await asyncio.sleep(interval)
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        state.count("chat_stream", 200, sent=sent + 14)
+        return response
+
+    @routes.post("/upload")
+    async def upload(request):
+        body = await request.read()
+        failure = _injected_failure(state, "upload")
+        if failure is not None:
+            return failure
+        await _delay(state)
+        digest = hashlib.sha256(body).hexdigest()[:16]
+        state.count("upload", 200, received=len(body))
+        return web.json_response({"url": f"{request.scheme}://{request.host}/uploads/{digest}.png"})
+
+    @routes.get("/audio/{text}")
+    async def audio(request):
+        failure = _injected_failure(state, "audio")
+        if failure is not None:
+            return failure
+        await _delay(state)
+        body = wav_bytes(int(state.settings["payload_kb"] * 1024))
+        state.count("audio", 200, sent=len(body))
+        return web.Response(body=body, content_type="audio/wav")
+
+    @routes.post("/api/device/code")
+    async def device_code(request):
+        code = hashlib.sha1(str(time.time_ns()).encode()).hexdigest()[:12]
+        state.count("device", 200)
+        return web.json_response({"device_code": code, "user_code": code[:4].upper() + "-" + code[4:8].upper(),
+                                  "verification_uri": "/device", "expires_in": 600, "interval": 0})
+
+    @routes.post("/api/device/token")
+    async def device_token(request):
+        code = (await request.json()).get("device_code", "")
+        state._device_polls[code] += 1
+        state.count("device", 200)
+        if state._device_polls[code] <= state.settings["device_pending_polls"]:
+            return web.json_response({"error": "authorization_pending"})
+        return web.json_response({"access_token": f"sk_mock_{code}"})
+
+    @routes.get("/api/device/userinfo")
+    async def device_userinfo(request):
+        state.count("device", 200)
+        return web.json_response({"name": "mock-user", "balance": 100.0})
+
+    @routes.get("/{kind:text|image|audio}/models")
+    async def models(request):
+        kind = request.match_info["kind"]
+        body = json.dumps(MODELS[kind]).encode()
+        etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+        if request.headers.get("If-None-Match") == etag:
+            state.count("models", 304)
+            return web.Response(status=304, headers={"ETag": etag})
+        state.count("models", 200, sent=len(body))
+        return web.Response(body=body, content_type="application/json", headers={"ETag": etag})
+
+    @routes.get("/__stats")
+    async def stats(request):
+        return web.json_response(state.stats())
+
+    app = web.Application(client_max_size=64 * 1024 * 1024)
+    app.add_routes(routes)
+    return app
+
+
+class MockServer:
+    """Runs the stand-in on its own event loop thread; usable as a context manager."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, **settings):
+        self.host = host
+        self.port = port
+        self.state = MockState(**settings)
+        self._loop = None
+        self._runner = None
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._runner = web.AppRunner(build_app(self.state), access_log=None)
+            self._loop.run_until_complete(self._runner.setup())
+            site = web.TCPSite(self._runner, self.host, self.port)
+            self._loop.run_until_complete(site.start())
+            self.port = site._server.sockets[0].getsockname()[1]
+            ready.set()
+            self._loop.run_forever()
+            self._loop.run_until_complete(self._runner.cleanup())
+            self._loop.close()
+
+        self._thread = threading.Thread(target=run, name="pollinations-mock", daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency-ms", type=float, help="time to first byte of generation endpoints")
+    parser.add_argument("--jitter-ms", type=float, help="uniform random latency added on top")
+    parser.add_argument("--token-interval-ms", type=float, help="delay between SSE chunks")
+    parser.add_argument("--text-tokens", type=int, help="words per chat completion")
+    parser.add_argument("--payload-kb", type=float, help="audio clip size")
+    parser.add_argument("--image-format", choices=("jpeg", "png"))
+    parser.add_argument("--error-rate", type=float, help="fraction of 500 responses")
+    parser.add_argument("--rate-429", type=float, help="fraction of 429 responses")
+    parser.add_argument("--retry-after", type=int, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--device-pending-polls", type=int, help="token polls before a device login succeeds")
+
+
+def settings_from_args(args) -> dict:
+    return {k: getattr(args, k, None) for k in DEFAULTS}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local Pollinations API stand-in")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8189)
+    add_arguments(parser)
+    args = parser.parse_args()
+    state = MockState(**settings_from_args(args))
+    print(f"Pollinations mock on http://{args.host}:{args.port} {json.dumps(state.settings)}")
+    web.run_app(build_app(state), host=args.host, port=args.port, access_log=None, print=None)
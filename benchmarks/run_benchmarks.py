@@ -0,0 +1,272 @@
+"""
+Offline benchmarks for the Pollinations nodes.
+
+Starts the local API stand-in (mock_server.py), points the extension at it
+through the POLLINATIONS_*_BASE_URL / POLLINATIONS_CONFIG_PATH overrides and
+drives the real code paths:
+
+- image         PollinationsImageGen, cache bypassed (download + decode)
+- image-cached  PollinationsImageGen served from the local disk cache
+- text          PollinationsTextGen, plain JSON completion
+- text-stream   PollinationsTextGen, SSE streaming
+- upload        upload_to_pollinations with a fresh frame per call
+- byop          DeviceLoginManager device flow (code -> poll -> userinfo)
+- text-graph    one prompt of --graph-nodes independent Text Gen nodes, awaited
+                together through their async entry point (as ComfyUI does)
+
+For every scenario it reports p50/p95/p99 latency, requests/sec, bytes on
+the wire and (with --trace-alloc) the peak of Python-level allocations,
+which is where extra buffer copies show up. Peak RSS is a high-water mark of
+the whole process, so it is reported once for the run, not per scenario.
+
+    python benchmarks/run_benchmarks.py -n 200 -c 8 --latency-ms 50
+    python benchmarks/run_benchmarks.py --scenarios image text-stream --json out.json
+
+Run it from a ComfyUI checkout (or pass --comfyui PATH) to load the real
+`server` module; without ComfyUI a minimal PromptServer stand-in is used.
+Needs aiohttp, requests, numpy, Pillow and torch (PyAV is not used).
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from mock_server import MockServer, add_arguments, settings_from_args  # noqa: E402
+
+SCENARIOS = ("image", "image-cached", "text", "text-stream", "upload", "byop", "text-graph")
+PACKAGE = "pollinations_byop_bench"
+
+
+def install_server_stub():
+    """Minimal stand-in for ComfyUI's `server` module (routes, client_id, send_sync)."""
+    from aiohttp import web
+
+    class PromptServer:
+        instance = None
+
+        def __init__(self):
+            self.routes = web.RouteTableDef()
+            self.client_id = None  # id of the client whose prompt is running
+            self.events = 0
+
+        def send_sync(self, event, data, sid=None):
+            self.events += 1
+
+    PromptServer.instance = PromptServer()
+    module = types.ModuleType("server")
+    module.PromptServer = PromptServer
+    sys.modules["server"] = module
+
+
+def load_package(comfyui_dir=None):
+    if comfyui_dir:
+        sys.path.insert(0, comfyui_dir)
+    try:
+        import server  # noqa: F401
+    except ImportError:
+        install_server_stub()
+    spec = importlib.util.spec_from_file_location(PACKAGE, os.path.join(REPO_DIR, "__init__.py"),
+                                                  submodule_search_locations=[REPO_DIR])
+    package = importlib.util.module_from_spec(spec)
+    sys.modules[PACKAGE] = package
+    spec.loader.exec_module(package)
+    return package
+
+
+def write_config(path, args, cache_dir):
+    config = {"api_key": "sk_bench", "cache": {"dir": cache_dir},
+              "http": {"pool_maxsize": max(16, args.concurrency)}}
+    if not args.keep_rate_limits:
+        # Measure the client, not the politeness limits meant for the real API
+        config["scheduler"] = {"host_rps": 0, "max_concurrency": max(64, args.concurrency * 2),
+                               "backoff_base": 0.05, "backoff_max": 1.0}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2)
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        try:
+            import psutil
+            return psutil.Process().memory_info().peak_wset / 2 ** 20
+        except Exception:
+            return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def run_scenario(name, call, count, concurrency, mock, trace_alloc):
+    """Time `call(i)` for i in range(count) on `concurrency` threads."""
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def one(i):
+        start = time.perf_counter()
+        try:
+            call(i)
+        except Exception as e:
+            with lock:
+                errors.append(f"{type(e).__name__}: {e}")
+            return
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+
+    mock.state.reset()
+    if trace_alloc:
+        tracemalloc.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(count)))
+    wall = time.perf_counter() - started
+    alloc_peak = None
+    if trace_alloc:
+        alloc_peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+        tracemalloc.stop()
+    served = mock.state.stats()
+    latencies.sort()
+    ms = lambda v: None if v is None else round(v * 1000, 2)
+    return {
+        "scenario": name, "requests": count, "ok": len(latencies), "errors": len(errors),
+        "p50_ms": ms(percentile(latencies, 50)), "p95_ms": ms(percentile(latencies, 95)),
+        "p99_ms": ms(percentile(latencies, 99)), "rps": round(len(latencies) / wall, 2) if wall else None,
+        "wire_mb": round((served["bytes_sent"] + served["bytes_received"]) / 2 ** 20, 2),
+        "upstream_statuses": served["statuses"],
+        "alloc_peak_mb": None if alloc_peak is None else round(alloc_peak, 2),
+        "first_error": errors[0] if errors else None,
+    }
+
+
+def build_scenarios(package, args):
+    nodes = sys.modules[f"{PACKAGE}.pollinations_nodes"]
+    image_node, text_node = nodes.PollinationsImageGen(), nodes.PollinationsTextGen()
+    w, h = args.width, args.height
+    calls = {}
+
+    calls["image"] = lambda i: image_node.generate(f"benchmark {i}", "flux", w, h, seed=i, use_cache=False)
+
+    def cached(i):
+        image_node.generate("benchmark cached", "flux", w, h, seed=7, use_cache=True)
+    calls["image-cached"] = (cached, lambda: cached(-1))  # (call, warm-up)
+
+    calls["text"] = lambda i: text_node.generate(f"question {i}", "openai", "You are terse.")
+    calls["text-stream"] = lambda i: text_node.generate(f"question {i}", "openai", "You are terse.",
+                                                        stream=True, unique_id="bench")
+
+    def prepare_upload():
+        import torch
+        upload_module = importlib.import_module(f"{PACKAGE}.pollinations_upload")
+        generator = torch.Generator().manual_seed(0)
+        frames = [torch.rand((1, h, w, 3), generator=generator) for _ in range(args.requests)]
+        return lambda i: upload_module.upload_to_pollinations(frames[i])
+    calls["upload"] = prepare_upload
+
+    def byop(i):
+        manager = importlib.import_module(f"{PACKAGE}.byop_auth").DeviceLoginManager()
+
+        async def flow():
+            await manager.start()
+            await manager._task
+        asyncio.run(flow())
+        if manager.status()["state"] != "authorized":
+            raise RuntimeError(f"login ended in state {manager.status()['state']}")
+    calls["byop"] = byop
+
+    def text_graph(i):
+        async def graph():
+            await asyncio.gather(*(text_node.generate_async(prompt=f"question {i}.{n}", model="openai",
+                                                            system_instruction="You are terse.")
+                                   for n in range(args.graph_nodes)))
+        asyncio.run(graph())
+    calls["text-graph"] = text_graph
+    return calls
+
+
+def print_table(results):
+    columns = ("scenario", "ok", "errors", "p50_ms", "p95_ms", "p99_ms", "rps", "wire_mb", "alloc_peak_mb")
+    rows = [[("-" if r[c] is None else f"{r[c]:.2f}" if isinstance(r[c], float) else str(r[c])) for c in columns]
+            for r in results]
+    widths = [max(len(c), *(len(row[i]) for row in rows)) for i, c in enumerate(columns)]
+    print("  ".join(c.ljust(widths[i]) for i, c in enumerate(columns)))
+    for row in rows:
+        print("  ".join(v.ljust(widths[i]) for i, v in enumerate(row)))
+    for r in results:
+        if r["first_error"]:
+            print(f"[{r['scenario']}] first error: {r['first_error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline Pollinations node benchmarks")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("-n", "--requests", type=int, default=50, help="calls per scenario")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="calling threads")
+    parser.add_argument("--width", type=int, default=1024)
+    parser.add_argument("--height", type=int, default=1024)
+    parser.add_argument("--graph-nodes", type=int, default=8, help="independent nodes per text-graph call")
+    parser.add_argument("--keep-rate-limits", action="store_true",
+                        help="keep the scheduler's default per-host rate limits")
+    parser.add_argument("--trace-alloc", action="store_true",
+                        help="report peak Python allocations (slows the run down)")
+    parser.add_argument("--comfyui", help="ComfyUI checkout providing the real `server` module")
+    parser.add_argument("--json", help="also write the results to this file")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="pollinations-bench-")
+    with MockServer(**settings_from_args(args)) as mock:
+        config_path = os.path.join(workdir, "pollinations_config.json")
+        write_config(config_path, args, os.path.join(workdir, "cache"))
+        os.environ["POLLINATIONS_CONFIG_PATH"] = config_path
+        for name in ("GEN", "MEDIA", "ENTER"):
+            os.environ[f"POLLINATIONS_{name}_BASE_URL"] = mock.base_url
+
+        package = load_package(args.comfyui)
+        calls = build_scenarios(package, args)
+        print(f"Mock API at {mock.base_url}; {args.requests} calls x {len(args.scenarios)} scenarios, "
+              f"concurrency {args.concurrency}")
+
+        results = []
+        for name in args.scenarios:
+            call = calls[name]
+            if name == "upload":
+                call = call()
+            elif isinstance(call, tuple):
+                call, warm_up = call
+                warm_up()
+            results.append(run_scenario(name, call, args.requests, args.concurrency, mock, args.trace_alloc))
+            print(f"  {name}: done", flush=True)
+
+    peak_rss = peak_rss_mb()
+    print()
+    print_table(results)
+    if peak_rss is not None:
+        print(f"peak RSS of the whole run: {peak_rss:.1f} MB")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "results": results, "peak_rss_mb": peak_rss}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,18 +2,54 @@
 BYOP (Bring Your Own Pollen) Authentication Module
 Implements the official Pollinations BYOP device code flow for headless/CLI apps
 Reference: https://github.com/pollinations/pollinations/blob/main/BRING_YOUR_OWN_POLLEN.md
+
+Two ways to run the device flow:
+- BYOPAuth.authenticate_interactive(): blocking, for the terminal
+- DeviceLoginManager: non-blocking, polled by an asyncio task on the
+  ComfyUI server loop and driven by the /pollinations/byop/* routes
 """
 
-import requests
+import asyncio
+import hashlib
+import threading
 import time
 import json
 import os
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable
+
+try:
+    from .pollinations_http import base_url, get_session
+except ImportError:  # executed as a standalone script
+    from pollinations_http import base_url, get_session
 
 # Default app key for attribution (users can override with their own)
 # Create one at enter.pollinations.ai for proper branding on consent screen
 DEFAULT_APP_KEY = "pk_iMLHCKZ31UTDgWQr"  # comfyui_byop app key
 
+# get_user_info() results are reused for this many seconds
+USER_INFO_TTL = 60.0
+
+_user_info_cache = {}  # sha256(api_key) -> (expires_at, info)
+_user_info_lock = threading.Lock()
+
+
+def _key_id(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+def cache_user_info(api_key: str, info: Dict[str, Any], ttl: float = USER_INFO_TTL):
+    with _user_info_lock:
+        _user_info_cache[_key_id(api_key)] = (time.monotonic() + ttl, info)
+
+
+def cached_user_info(api_key: str) -> Optional[Dict[str, Any]]:
+    with _user_info_lock:
+        entry = _user_info_cache.get(_key_id(api_key))
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+    return None
+
+
 class BYOPAuth:
     """
     Handles BYOP authentication flows:
@@ -22,7 +58,7 @@ class BYOPAuth:
     - App Key attribution
     """
     
-    BASE_URL = "https://enter.pollinations.ai"
+    BASE_URL = base_url("enter")
     
     def __init__(self, app_key: Optional[str] = None):
         """
@@ -34,7 +70,7 @@ class BYOPAuth:
                     With it: consent screen shows your app name + GitHub
         """
         self.app_key = app_key or DEFAULT_APP_KEY
-        self.session = requests.Session()
+        self.session = get_session()  # shared keep-alive pool
     
     def request_device_code(self, scope: str = "generate") -> Dict[str, Any]:
         """
@@ -99,12 +135,13 @@ class BYOPAuth:
         print("BYOP Auth: Polling timeout (user took too long)")
         return None
     
-    def get_user_info(self, api_key: str) -> Optional[Dict[str, Any]]:
+    def get_user_info(self, api_key: str, max_age: float = USER_INFO_TTL) -> Optional[Dict[str, Any]]:
         """
         Get user profile info from an API key.
         
         Args:
             api_key: The user's API key (sk_...)
+            max_age: Reuse a cached result younger than this (0 = always fetch)
             
         Returns:
             {
@@ -116,13 +153,19 @@ class BYOPAuth:
                 "balance": 100
             }
         """
+        if max_age > 0:
+            info = cached_user_info(api_key)
+            if info is not None:
+                return info
         try:
             response = self.session.get(
                 f"{self.BASE_URL}/api/device/userinfo",
                 headers={"Authorization": f"Bearer {api_key}"}
             )
             response.raise_for_status()
-            return response.json()
+            info = response.json()
+            cache_user_info(api_key, info, max_age or USER_INFO_TTL)
+            return info
         except Exception as e:
             print(f"Failed to get user info: {e}")
             return None
@@ -144,7 +187,7 @@ class BYOPAuth:
             device_code = device_data["device_code"]
             interval = device_data.get("interval", 5)
             
-            print(f"\n📱 Go to: https://enter.pollinations.ai{device_data['verification_uri']}")
+            print(f"\n📱 Go to: {self.BASE_URL}{device_data['verification_uri']}")
             print(f"🔑 Enter code: {user_code}")
             print("\n⏳ Waiting for authorization...")
             
@@ -157,7 +200,7 @@ class BYOPAuth:
                     name = user_info.get('name', user_info.get('preferred_username', 'User'))
                     balance = user_info.get('balance', 'unknown')
                     print(f"\n✅ Authenticated as: {name}")
-                    print(f💰 Balance: {balance} Pollen")
+                    print(f"💰 Balance: {balance} Pollen")
                 return api_key
             else:
                 print("\n❌ Authentication failed or timed out")
@@ -168,6 +211,120 @@ class BYOPAuth:
             return None
 
 
+class DeviceLoginManager:
+    """
+    Non-blocking device flow for the ComfyUI server.
+
+    start() requests a device code and returns immediately with the
+    user_code / verification_uri to show in the UI; an asyncio task on the
+    server loop then polls for the token and hands it to on_token(). status()
+    reports progress without ever exposing the key itself.
+
+    Whoever enters the user_code binds their account to this server, so the
+    code and the account details are reported only to the client that
+    started the login (`owner`, a ComfyUI client id): status(viewer) shows
+    anyone else just the state, and on_status(status, owner) is expected to
+    deliver to that client alone.
+    """
+
+    BASE_URL = BYOPAuth.BASE_URL
+
+    def __init__(self, on_token: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+                 on_status: Optional[Callable[[Dict[str, Any], Optional[str]], None]] = None):
+        self.on_token = on_token
+        self.on_status = on_status
+        self._task = None
+        self._owner = None
+        self._state = {"state": "idle"}
+        self._result = None  # (api_key, user_info) of the last successful login
+
+    def status(self, viewer: Optional[str] = None) -> Dict[str, Any]:
+        """Full progress for the client that started the login, only the state for anyone else."""
+        state = self._full_status()
+        if self._owner is None or viewer != self._owner:
+            return {"state": state["state"]}
+        return state
+
+    def _full_status(self) -> Dict[str, Any]:
+        state = dict(self._state)
+        if state.get("state") == "pending" and time.time() > state.get("expires_at", 0):
+            state["state"] = "expired"
+        return state
+
+    def result(self) -> Optional[tuple]:
+        return self._result
+
+    def _set_state(self, **state):
+        self._state = state
+        if self.on_status:
+            try:
+                self.on_status(self._full_status(), self._owner)
+            except Exception as e:
+                print(f"[BYOP] Status callback failed: {e}")
+
+    async def start(self, app_key: Optional[str] = None, scope: str = "generate",
+                    owner: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Begin a login on behalf of client `owner` and return its full status,
+        or return status(owner) of the login already waiting for the user.
+        """
+        if self._task is not None and not self._task.done() and self._full_status()["state"] == "pending":
+            return self.status(owner)
+        import aiohttp
+        async with aiohttp.ClientSession() as session:
+            async with session.post(f"{self.BASE_URL}/api/device/code",
+                                    json={"client_id": app_key or DEFAULT_APP_KEY, "scope": scope}) as resp:
+                resp.raise_for_status()
+                data = await resp.json()
+        uri = data.get("verification_uri", "/device")
+        if uri.startswith("/"):
+            uri = f"{self.BASE_URL}{uri}"
+        self._owner = owner
+        self._set_state(state="pending", user_code=data["user_code"], verification_uri=uri,
+                        expires_at=time.time() + int(data.get("expires_in", 1800)))
+        self._task = asyncio.ensure_future(self._poll(data["device_code"], int(data.get("interval", 5)),
+                                                      int(data.get("expires_in", 1800))))
+        return self._full_status()
+
+    async def _poll(self, device_code: str, interval: int, expires_in: int):
+        import aiohttp
+        deadline = time.monotonic() + expires_in
+        try:
+            async with aiohttp.ClientSession() as session:
+                while time.monotonic() < deadline:
+                    await asyncio.sleep(interval)
+                    async with session.post(f"{self.BASE_URL}/api/device/token",
+                                            json={"device_code": device_code}) as resp:
+                        data = await resp.json(content_type=None)
+                    if "access_token" in data:
+                        api_key = data["access_token"]
+                        async with session.get(f"{self.BASE_URL}/api/device/userinfo",
+                                               headers={"Authorization": f"Bearer {api_key}"}) as resp:
+                            info = await resp.json(content_type=None) if resp.status == 200 else {}
+                        cache_user_info(api_key, info)
+                        self._result = (api_key, info)
+                        if self.on_token:
+                            self.on_token(api_key, info)
+                        self._set_state(state="authorized",
+                                        username=info.get("name", info.get("preferred_username", "")),
+                                        balance=info.get("balance"))
+                        return
+                    error = data.get("error")
+                    if error == "authorization_pending":
+                        continue
+                    if error == "slow_down":
+                        interval += 5
+                        continue
+                    self._set_state(state="error", error=data.get("error_description", error or "unknown error"))
+                    return
+            self._set_state(state="expired")
+        except asyncio.CancelledError:
+            self._set_state(state="idle")
+            raise
+        except Exception as e:
+            self._set_state(state="error", error=str(e))
+
+
 # Convenience function for quick auth
 def byop_login(app_key: Optional[str] = None) -> Optional[str]:
     """
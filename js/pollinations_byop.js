@@ -0,0 +1,23 @@
+import { app } from "../../../scripts/app.js";
+import { api } from "../../../scripts/api.js";
+
+// Shows the BYOP device-login code while the server polls for the token in the background.
+app.registerExtension({
+    name: "Pollinations.BYOPLogin",
+    async setup() {
+        api.addEventListener("pollinations.byop", ({ detail }) => {
+            if (detail.state === "pending") {
+                app.ui.dialog.show(
+                    `<h3>🔐 Pollinations BYOP Login</h3>` +
+                    `<p>Open <a href="${detail.verification_uri}" target="_blank">${detail.verification_uri}</a> and enter the code:</p>` +
+                    `<p style="font-size:2em;font-family:monospace;letter-spacing:0.1em">${detail.user_code}</p>` +
+                    `<p>The queue keeps running. Once you approve, your key is saved automatically.</p>`
+                );
+            } else if (detail.state === "authorized") {
+                app.ui.dialog.show(`<h3>✅ Logged in to Pollinations</h3><p>${detail.username || ""} · ${detail.balance ?? "?"} Pollen</p>`);
+            } else if (detail.state === "error" || detail.state === "expired") {
+                app.ui.dialog.show(`<h3>❌ Pollinations login ${detail.state}</h3><p>${detail.error || "The code expired. Queue the login node again."}</p>`);
+            }
+        });
+    },
+});
@@ -0,0 +1,39 @@
+import { app } from "../../../scripts/app.js";
+import { api } from "../../../scripts/api.js";
+import { ComfyWidgets } from "../../../scripts/widgets.js";
+
+// Shows streamed Text Gen output live on the node, plus TTFT / tokens per second when done.
+app.registerExtension({
+    name: "Pollinations.TextStream",
+    async setup() {
+        const getPreview = (node) => {
+            let widget = node.widgets?.find((w) => w.name === "stream_preview");
+            if (!widget) {
+                widget = ComfyWidgets["STRING"](node, "stream_preview", ["STRING", { multiline: true }], app).widget;
+                widget.inputEl.readOnly = true;
+                widget.inputEl.style.opacity = 0.7;
+                widget.serialize = false;
+            }
+            return widget;
+        };
+
+        api.addEventListener("pollinations.text.stream", ({ detail }) => {
+            const node = app.graph.getNodeById(Number(detail.node));
+            if (!node) return;
+            const widget = getPreview(node);
+            if (detail.start) {
+                widget.value = "";
+            } else if (detail.delta) {
+                widget.value += detail.delta;
+            } else if (detail.done) {
+                if (detail.error) {
+                    widget.value += `\n\n[stream failed: ${detail.error}]`;
+                } else {
+                    const s = detail.stats;
+                    widget.value = `${detail.text}\n\n[TTFT ${s.ttft.toFixed(2)}s · ${s.tokens_per_sec.toFixed(1)} tok/s · ${s.tokens} tokens]`;
+                }
+            }
+            app.graph.setDirtyCanvas(true, false);
+        });
+    },
+});
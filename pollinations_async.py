@@ -0,0 +1,109 @@
+"""
+Async execution of the Pollinations nodes.
+
+ComfyUI (0.3.44 and later) awaits nodes whose FUNCTION is a coroutine and
+keeps executing other ready nodes meanwhile, so independent Pollinations
+nodes of one prompt overlap their network waits instead of running one
+after another. @async_node gives a node class an async entry point that
+runs its regular (blocking) generate() on a worker thread: the transport
+stays the shared pooled session with the scheduler's retries, rate limits,
+key pool and metrics, while the executor's event loop is free.
+
+At most `max_concurrency` node calls run at the same time across the whole
+process (the scheduler's own cap still applies per HTTP request).
+Configured by the "async" section of pollinations_config.json:
+
+    "async": {"enabled": "auto", "max_concurrency": 16}
+
+"auto" switches async execution on when the running ComfyUI supports it;
+true / false force it. Older ComfyUI versions keep the synchronous nodes.
+"""
+
+import asyncio
+import contextvars
+import functools
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from .pollinations_config import get_section
+
+DEFAULT_SETTINGS = {
+    "enabled": "auto",
+    "max_concurrency": 16,
+}
+MIN_COMFYUI_VERSION = (0, 3, 44)
+
+_executor = None
+_executor_lock = threading.Lock()
+_semaphores = weakref.WeakKeyDictionary()
+
+
+def get_async_settings():
+    settings = dict(DEFAULT_SETTINGS)
+    settings.update(get_section("async"))
+    return settings
+
+
+def comfyui_version() -> Optional[tuple]:
+    try:
+        from comfyui_version import __version__
+    except ImportError:
+        return None
+    try:
+        return tuple(int(part) for part in __version__.split(".")[:3])
+    except ValueError:
+        return None
+
+
+def async_enabled() -> bool:
+    enabled = get_async_settings()["enabled"]
+    if enabled == "auto":
+        version = comfyui_version()
+        return version is not None and version >= MIN_COMFYUI_VERSION
+    return bool(enabled)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=max(1, int(get_async_settings()["max_concurrency"])),
+                                               thread_name_prefix="pollinations-node")
+    return _executor
+
+
+def _get_semaphore() -> asyncio.Semaphore:
+    # One semaphore per event loop: asyncio primitives must not cross loops
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _semaphores[loop] = asyncio.Semaphore(max(1, int(get_async_settings()["max_concurrency"])))
+    return semaphore
+
+
+async def run_blocking(fn: Callable[..., Any], *args, **kwargs) -> Any:
+    """Await fn(*args, **kwargs) on the node worker pool, within the global concurrency cap."""
+    call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+    async with _get_semaphore():
+        return await asyncio.get_running_loop().run_in_executor(_get_executor(), call)
+
+
+def async_node(cls):
+    """
+    Class decorator: adds `generate_async`, which awaits the class's FUNCTION
+    on a worker thread, and makes it the node's FUNCTION when async
+    execution is enabled.
+    """
+    blocking = cls.FUNCTION
+
+    async def generate_async(self, **kwargs):
+        return await run_blocking(getattr(self, blocking), **kwargs)
+
+    generate_async.__name__ = f"{blocking}_async"
+    setattr(cls, generate_async.__name__, generate_async)
+    if async_enabled():
+        cls.FUNCTION = generate_async.__name__
+    return cls
@@ -0,0 +1,61 @@
+"""
+Audio download and decoding for PollinationsAudioGen.
+
+The clip is streamed once, chunk by chunk, into the audio DiskCache and then
+decoded from disk with PyAV (a ComfyUI dependency), frame by frame, into
+ComfyUI's AUDIO dict: {"waveform": [1, channels, samples] float32, "sample_rate": int}.
+The encoded file is never held in memory.
+"""
+
+from typing import Any, Dict
+
+from .pollinations_cache import get_audio_cache
+from .pollinations_metrics import get_metrics, record_generation, route_of
+from .pollinations_scheduler import scheduled_request
+
+CHUNK_SIZE = 256 * 1024
+
+
+def download_audio(url: str, headers: Dict[str, str], cache_key: str, use_cache: bool = True) -> str:
+    """Path of the encoded clip, downloaded once into the audio cache."""
+    cache = get_audio_cache()
+    if use_cache:
+        path = cache.get_path(cache_key)
+        if path:
+            return path
+    metrics = get_metrics()
+    with scheduled_request("GET", url, budget="audio", headers=headers, stream=True) as r, metrics.timed("download"):
+        path = cache.put_stream(cache_key, r.iter_content(CHUNK_SIZE),
+                                meta={"content_type": r.headers.get("Content-Type", "")})
+        metrics.add_bytes(route_of(url), received=r.raw.tell())
+    record_generation("audio", url)
+    return path
+
+
+def decode_audio(path: str) -> Dict[str, Any]:
+    """Decode an audio file into a ComfyUI AUDIO dict."""
+    import av
+    import torch
+
+    with av.open(path) as container:
+        stream = container.streams.audio[0]
+        sample_rate = stream.rate or stream.codec_context.sample_rate
+        # Planar float32 output regardless of the codec's native sample format
+        resampler = av.AudioResampler(format="fltp", layout=stream.layout.name, rate=sample_rate)
+        chunks = []
+        for frame in container.decode(stream):
+            for out in resampler.resample(frame):
+                chunks.append(out.to_ndarray())
+        for out in resampler.resample(None):
+            chunks.append(out.to_ndarray())
+    if not chunks:
+        raise ValueError(f"No audio samples decoded from {path}")
+    channels = chunks[0].shape[0]
+    samples = sum(c.shape[1] for c in chunks)
+    waveform = torch.empty((1, channels, samples), dtype=torch.float32)
+    target = waveform.numpy()[0]
+    offset = 0
+    for c in chunks:
+        target[:, offset:offset + c.shape[1]] = c
+        offset += c.shape[1]
+    return {"waveform": waveform, "sample_rate": int(sample_rate)}
@@ -1,48 +1,151 @@
-import requests
 import json
 import re
 import os
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+try:
+    from .pollinations_http import base_url
+    from .pollinations_scheduler import scheduled_request
+except ImportError:  # executed as a standalone script
+    from pollinations_http import base_url
+    from pollinations_scheduler import scheduled_request
+
 # --- CONFIGURATION ---
 REPO_DIR = os.path.dirname(os.path.abspath(__file__))
 JSON_FILE = os.path.join(REPO_DIR, "models.json")
+INDEX_FILE = os.path.join(REPO_DIR, "models_index.json")
 README_FILE = os.path.join(REPO_DIR, "README.md")
 
-def fetch_api_models():
+SOURCES = {
+    "text": f"{base_url('gen')}/text/models",
+    "image": f"{base_url('gen')}/image/models",  # image + video models
+    "audio": f"{base_url('gen')}/audio/models",
+}
+PAID_MARK = "💎"
+# Per-model constraints worth surfacing to the nodes when the API reports them
+LIMIT_FIELDS = ("context_window", "max_tokens", "max_output_tokens", "max_duration", "min_duration",
+                "max_width", "max_height", "max_images", "voices")
+
+# --- MODEL INDEX ---
+
+def write_json_atomic(path, data, **kwargs):
+    # Nodes read these files at runtime: never expose a half-written one
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, **kwargs)
+    os.replace(tmp, path)
+
+def load_index():
+    try:
+        with open(INDEX_FILE, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+            if isinstance(index, dict): return index
+    except Exception: pass
+    return {"sources": {}, "models": {}}
+
+def display_name(entry):
+    return f"{entry['name']} {PAID_MARK}" if entry.get("paid_only") else entry["name"]
+
+def index_entries(source, payload):
+    """Normalize one /models response into {kind: {name: entry}}."""
+    result = {}
+    for m in payload if isinstance(payload, list) else []:
+        if not isinstance(m, dict) or not m.get("name"): continue
+        outputs = m.get("output_modalities") or []
+        if source == "image":
+            kind = "video" if "video" in outputs else "image"
+        else:
+            kind = source
+        entry = dict(m)
+        entry.update({
+            "kind": kind,
+            "source": source,
+            "paid_only": bool(m.get("paid_only")),
+            "input_modalities": m.get("input_modalities") or [],
+            "output_modalities": outputs,
+            "limits": {k: m[k] for k in LIMIT_FIELDS if k in m},
+        })
+        entry["display"] = display_name(entry)
+        result.setdefault(kind, {})[m["name"]] = entry
+    return result
+
+def fetch_source(source, url, validators):
+    """Conditional GET. Returns (payload or None if unchanged, new validators)."""
+    headers = {}
+    if validators.get("etag"): headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"): headers["If-Modified-Since"] = validators["last_modified"]
+    r = scheduled_request("GET", url, budget="updater", headers=headers, timeout=10)
+    if r.status_code == 304:
+        return None, validators
+    payload = r.json()
+    if not isinstance(payload, list) or not payload:
+        raise ValueError(f"unexpected {source} models payload")
+    return payload, {"etag": r.headers.get("ETag"), "last_modified": r.headers.get("Last-Modified")}
+
+def models_from_index(index):
+    """models.json shape: display names per kind, sorted."""
+    models = {"image": [], "video": [], "text": [], "audio": []}
+    for kind, entries in index.get("models", {}).items():
+        models.setdefault(kind, []).extend(e["display"] for e in entries.values())
+    return {kind: sorted(names) for kind, names in models.items()}
+
+def refresh_catalog(write_readme=True):
+    """
+    Fetch the three /models endpoints concurrently with ETag / If-Modified-Since and
+    rewrite models_index.json, models.json (and README.md) only when something changed.
+    No git side effects, so it is safe to call at runtime.
+
+    Returns a summary dict, or None if the API could not be reached.
+    """
     print("🛰️ Scouting Pollinations Official API (Quad-Modal Pass)...")
+    index = load_index()
+    sources = index.get("sources", {})
     try:
-        # 1. Text Models
-        text_resp = requests.get("https://gen.pollinations.ai/text/models", timeout=10).json()
-        text_models = [f"{m['name']} 💎" if m.get("paid_only") else m["name"] for m in text_resp if "name" in m]
-        
-        # 2. Image & Video Models
-        img_vid_resp = requests.get("https://gen.pollinations.ai/image/models", timeout=10).json()
-        image_models, video_models = [], []
-        for m in img_vid_resp:
-            name = m.get("name")
-            if not name: continue
-            display = f"{name} 💎" if m.get("paid_only") else name
-            if "video" in m.get("output_modalities", []):
-                video_models.append(display)
-            else:
-                image_models.append(display)
-
-        # 3. Audio Models
-        audio_resp = requests.get("https://gen.pollinations.ai/audio/models", timeout=10).json()
-        audio_models = [f"{m['name']} 💎" if m.get("paid_only") else m["name"] for m in audio_resp if "name" in m]
-
-        return {
-            "image": sorted(image_models), 
-            "video": sorted(video_models), 
-            "text": sorted(text_models),
-            "audio": sorted(audio_models)
-        }
+        with ThreadPoolExecutor(max_workers=len(SOURCES)) as pool:
+            futures = {src: pool.submit(fetch_source, src, url, sources.get(src, {})) for src, url in SOURCES.items()}
+            results = {src: f.result() for src, f in futures.items()}
     except Exception as e:
         print(f"❌ API Fetch Failed: {e}")
         return None
 
+    not_modified = [src for src, (payload, _) in results.items() if payload is None]
+    models = {kind: dict(entries) for kind, entries in index.get("models", {}).items()}
+    new_sources = dict(sources)
+    for src, (payload, validators) in results.items():
+        new_sources[src] = validators
+        if payload is None: continue
+        for kind in list(models):
+            models[kind] = {n: e for n, e in models[kind].items() if e.get("source") != src}
+        for kind, entries in index_entries(src, payload).items():
+            models.setdefault(kind, {}).update(entries)
+
+    changed = models != index.get("models", {})
+    new_index = {"sources": new_sources, "models": models}
+    if changed or new_sources != sources:
+        write_json_atomic(INDEX_FILE, new_index, indent=4, sort_keys=True)
+
+    model_lists = models_from_index(new_index)
+    if changed:
+        try:
+            with open(JSON_FILE, 'r', encoding='utf-8') as f:
+                changed = json.load(f) != model_lists
+        except Exception: pass
+    if changed:
+        write_json_atomic(JSON_FILE, model_lists, indent=4)
+        if write_readme: update_readme(model_lists)
+        print("   ✅ Model catalog updated.")
+    else:
+        print("   ✅ Model catalog unchanged.")
+    return {"changed": changed, "not_modified": sorted(not_modified),
+            "counts": {kind: len(names) for kind, names in model_lists.items()}}
+
+def fetch_api_models():
+    """Display-name lists per kind (refreshes the index as a side effect)."""
+    if refresh_catalog(write_readme=False) is None: return None
+    return models_from_index(load_index())
+
 def update_readme(models):
     print("📝 Updating README.md...")
     if not os.path.exists(README_FILE): return
@@ -82,9 +185,6 @@ def git_sync_everything():
 
 if __name__ == "__main__":
     os.chdir(REPO_DIR)
-    live_models = fetch_api_models()
-    if live_models:
-        with open(JSON_FILE, 'w', encoding='utf-8') as f:
-            json.dump(live_models, f, indent=4)
-        update_readme(live_models)
+    summary = refresh_catalog(write_readme=True)
+    if summary:
         git_sync_everything()
\ No newline at end of file
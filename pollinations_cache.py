@@ -0,0 +1,386 @@
+"""
+Local result caches for the Pollinations nodes.
+
+DiskCache stores raw encoded payloads (PNG/JPEG/... bytes exactly as the API
+returned them) under a content-addressed key, with a total size cap and LRU
+eviction. Recency survives restarts because hits touch the file mtime.
+
+Settings come from the optional "cache" section of pollinations_config.json:
+
+    "cache": {"dir": "/path/to/cache", "image_max_mb": 2048, "audio_max_mb": 1024,
+              "video_max_mb": 4096}
+
+KeyValueStore is a small persistent string map with per-entry expiry
+(SQLite), used e.g. to remember which input images were already uploaded.
+
+ResponseCache memoizes text responses: an in-memory LRU tier in front of an
+optional persistent KeyValueStore tier, both with a TTL, plus hit/miss
+counters. Configured by the optional "text_cache" section:
+
+    "text_cache": {"max_entries": 512, "ttl_hours": 24, "persistent": true}
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+try:
+    from .pollinations_config import get_section
+except ImportError:  # executed as a standalone script
+    from pollinations_config import get_section
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+DATA_SUFFIX = ".bin"
+META_SUFFIX = ".json"
+
+
+def make_key(**params: Any) -> str:
+    """Stable hash of normalized request parameters."""
+    blob = json.dumps(params, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+def tensor_digest(tensor) -> str:
+    """Fast content hash of an IMAGE tensor (shape, dtype and raw bytes)."""
+    array = tensor.detach().cpu().contiguous().numpy()
+    h = hashlib.blake2b(digest_size=20)
+    h.update(f"{array.shape}|{array.dtype}".encode("ascii"))
+    h.update(memoryview(array).cast("B"))
+    return h.hexdigest()
+
+
+class DiskCache:
+    """
+    Size-capped, LRU-evicted byte cache on disk.
+
+    Entries are `<key>.bin` files with an optional `<key>.json` metadata
+    sidecar. Writes go through a temp file + rename, so readers never see a
+    partially written payload.
+    """
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> size, least recently used first
+        self._total = 0
+        self._loaded = False
+        self.counters = {"hits": 0, "misses": 0}
+
+    def _load(self):
+        if self._loaded:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        found = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(DATA_SUFFIX):
+                continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            found.append((st.st_mtime, name[:-len(DATA_SUFFIX)], st.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self._total += size
+        self._loaded = True
+
+    def _path(self, key: str, suffix: str = DATA_SUFFIX) -> str:
+        return os.path.join(self.directory, key + suffix)
+
+    def get_path(self, key: str) -> Optional[str]:
+        """Path of a cached payload (marking it recently used), or None on a miss."""
+        with self._lock:
+            self._load()
+            if key not in self._entries:
+                self.counters["misses"] += 1
+                return None
+            path = self._path(key)
+            if not os.path.exists(path):
+                self._total -= self._entries.pop(key)
+                self.counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.counters["hits"] += 1
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def stored_path(self, key: str) -> Optional[str]:
+        """Path of a cached payload without counting a lookup or touching its recency."""
+        with self._lock:
+            self._load()
+            return self._path(key) if key in self._entries else None
+
+    def get_meta(self, key: str) -> Dict[str, Any]:
+        try:
+            with open(self._path(key, META_SUFFIX), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def put(self, key: str, data, meta: Optional[Dict[str, Any]] = None) -> str:
+        """Store a bytes-like payload atomically and evict least recently used entries over the cap."""
+        return self.put_stream(key, [data], meta)
+
+    def put_stream(self, key: str, chunks: Iterable, meta: Optional[Dict[str, Any]] = None) -> str:
+        """Store a payload written chunk by chunk (never held in memory as a whole)."""
+        with self._lock:
+            self._load()
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        size = 0
+        try:
+            with open(tmp, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    size += len(chunk)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+        if meta is not None:
+            self._write_meta(key, meta)
+        self._record(key, size)
+        return path
+
+    def partial_path(self, key: str) -> str:
+        """Where an in-progress download for key may accumulate (see put_file)."""
+        with self._lock:
+            self._load()
+        return self._path(key, ".part")
+
+    def put_file(self, key: str, src_path: str, meta: Optional[Dict[str, Any]] = None) -> str:
+        """Move a finished file (on the same filesystem) into the cache."""
+        with self._lock:
+            self._load()
+        path = self._path(key)
+        os.replace(src_path, path)
+        if meta is not None:
+            self._write_meta(key, meta)
+        self._record(key, os.path.getsize(path))
+        return path
+
+    def _write_meta(self, key: str, meta: Dict[str, Any]):
+        meta_tmp = self._path(key, META_SUFFIX) + f".{threading.get_ident()}.tmp"
+        with open(meta_tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(meta_tmp, self._path(key, META_SUFFIX))
+
+    def _record(self, key: str, size: int):
+        with self._lock:
+            self._total -= self._entries.pop(key, 0)
+            self._entries[key] = size
+            self._total += size
+            self._evict()
+
+    def _evict(self):
+        while self._total > self.max_bytes and len(self._entries) > 1:
+            key, size = self._entries.popitem(last=False)
+            self._total -= size
+            for suffix in (DATA_SUFFIX, META_SUFFIX):
+                try:
+                    os.remove(self._path(key, suffix))
+                except OSError:
+                    pass
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return _with_hit_rate(dict(self.counters, entries=len(self._entries), bytes=self._total))
+
+
+class KeyValueStore:
+    """Persistent string -> string map with optional per-entry expiry, backed by SQLite."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+        self.counters = {"hits": 0, "misses": 0}
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+            conn.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._db().execute("SELECT value, expires FROM kv WHERE key = ?", (key,)).fetchone()
+            hit = row is not None and (row[1] is None or row[1] > time.time())
+            self.counters["hits" if hit else "misses"] += 1
+        return row[0] if hit else None
+
+    def set(self, key: str, value: str, ttl: Optional[float] = None):
+        expires = time.time() + ttl if ttl else None
+        with self._lock:
+            db = self._db()
+            db.execute("INSERT OR REPLACE INTO kv (key, value, expires) VALUES (?, ?, ?)", (key, value, expires))
+            db.commit()
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            db = self._db()
+            cur = db.execute("DELETE FROM kv WHERE expires IS NOT NULL AND expires <= ?", (time.time(),))
+            db.commit()
+            return cur.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        return _with_hit_rate(dict(self.counters))
+
+
+class ResponseCache:
+    """In-memory LRU tier + optional persistent tier, with TTL and hit/miss counters."""
+
+    def __init__(self, max_entries: int, ttl: float, store: Optional[KeyValueStore] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.store = store
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> (expires, value)
+        self.counters = {"memory_hits": 0, "persistent_hits": 0, "misses": 0}
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    return entry[1]
+                del self._memory[key]
+        value = None
+        if self.store is not None:
+            try:
+                value = self.store.get(key)
+            except Exception:
+                value = None
+        with self._lock:
+            if value is None:
+                self.counters["misses"] += 1
+                return None
+            self.counters["persistent_hits"] += 1
+            self._remember(key, value, now)
+        return value
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            self._remember(key, value, time.time())
+        if self.store is not None:
+            try:
+                self.store.set(key, value, self.ttl)
+            except Exception:
+                pass
+
+    def _remember(self, key: str, value: str, now: float):
+        self._memory[key] = (now + self.ttl, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.counters, entries=len(self._memory))
+        return _with_hit_rate(stats)
+
+
+def _with_hit_rate(stats: Dict[str, Any]) -> Dict[str, Any]:
+    lookups = sum(v for k, v in stats.items() if k.endswith("hits")) + stats["misses"]
+    stats["hit_rate"] = round((lookups - stats["misses"]) / lookups, 4) if lookups else 0.0
+    return stats
+
+
+_image_cache = None
+_audio_cache = None
+_video_cache = None
+_upload_store = None
+_text_cache = None
+_caches_lock = threading.Lock()
+
+
+def get_cache_dir() -> str:
+    return get_section("cache").get("dir") or DEFAULT_CACHE_DIR
+
+
+def get_image_cache() -> DiskCache:
+    """Process-wide cache for PollinationsImageGen results."""
+    global _image_cache
+    if _image_cache is None:
+        with _caches_lock:
+            if _image_cache is None:
+                max_mb = float(get_section("cache").get("image_max_mb", 2048))
+                _image_cache = DiskCache(os.path.join(get_cache_dir(), "images"), int(max_mb * 1024 * 1024))
+    return _image_cache
+
+
+def get_audio_cache() -> DiskCache:
+    """Process-wide cache for downloaded PollinationsAudioGen clips."""
+    global _audio_cache
+    if _audio_cache is None:
+        with _caches_lock:
+            if _audio_cache is None:
+                max_mb = float(get_section("cache").get("audio_max_mb", 1024))
+                _audio_cache = DiskCache(os.path.join(get_cache_dir(), "audio"), int(max_mb * 1024 * 1024))
+    return _audio_cache
+
+
+def get_video_cache() -> DiskCache:
+    """Process-wide cache for downloaded PollinationsVideoGen files."""
+    global _video_cache
+    if _video_cache is None:
+        with _caches_lock:
+            if _video_cache is None:
+                max_mb = float(get_section("cache").get("video_max_mb", 4096))
+                _video_cache = DiskCache(os.path.join(get_cache_dir(), "video"), int(max_mb * 1024 * 1024))
+    return _video_cache
+
+
+def get_upload_store() -> KeyValueStore:
+    """Persistent map from input-image content hash to its media.pollinations.ai URL."""
+    global _upload_store
+    if _upload_store is None:
+        with _caches_lock:
+            if _upload_store is None:
+                store = KeyValueStore(os.path.join(get_cache_dir(), "uploads.sqlite3"))
+                try:
+                    store.purge_expired()
+                except Exception:
+                    pass
+                _upload_store = store
+    return _upload_store
+
+
+def get_text_cache() -> ResponseCache:
+    """Process-wide cache for PollinationsTextGen responses."""
+    global _text_cache
+    if _text_cache is None:
+        with _caches_lock:
+            if _text_cache is None:
+                settings = get_section("text_cache")
+                store = None
+                if settings.get("persistent", True):
+                    store = KeyValueStore(os.path.join(get_cache_dir(), "text.sqlite3"))
+                _text_cache = ResponseCache(int(settings.get("max_entries", 512)),
+                                            float(settings.get("ttl_hours", 24)) * 3600, store)
+    return _text_cache
+
+
+def cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Hit/miss counters of the caches opened so far in this process (none are created here)."""
+    caches = {"image": _image_cache, "audio": _audio_cache, "video": _video_cache,
+              "upload": _upload_store, "text": _text_cache}
+    return {name: cache.stats() for name, cache in caches.items() if cache is not None}
@@ -0,0 +1,152 @@
+"""
+Model catalog and startup timing for the Pollinations nodes.
+
+ComfyUI calls every node's INPUT_TYPES whenever it builds /object_info, so
+models.json is parsed once into a shared ModelCatalog and only re-read when
+the file's mtime changes (e.g. after the auto-updater ran).
+
+The catalog also loads models_index.json, written by the auto-updater, which
+holds each model's capabilities, modalities, paid flag and limits; nodes look
+models up there in O(1) by dropdown (display) name or API name.
+
+The timing helpers record how long the extension took to import and how much
+time INPUT_TYPES calls add to /object_info; see startup_report().
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+MODELS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models.json")
+INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models_index.json")
+PAID_MARK = "💎"
+FALLBACK_MODELS = {"image": ["flux"], "video": ["wan"], "text": ["openai"], "audio": ["elevenlabs"]}
+
+
+class ModelCatalog:
+    """models.json (+ models_index.json) loaded once, invalidated by file mtime, shared by all nodes."""
+
+    def __init__(self, path: str = MODELS_PATH, index_path: str = INDEX_PATH):
+        self.path = path
+        self.index_path = index_path
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._index_mtime = None
+        self._models = FALLBACK_MODELS
+        self._by_display = {}
+        self._by_name = {}
+        self.loads = 0
+        self.load_seconds = 0.0
+
+    def models(self) -> Dict[str, list]:
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except OSError:
+            return self._models
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    self._reload(mtime)
+        return self._models
+
+    def _reload(self, mtime):
+        start = time.perf_counter()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            self._models = {kind: data.get(kind) or fallback for kind, fallback in FALLBACK_MODELS.items()}
+        except Exception:
+            self._models = FALLBACK_MODELS
+        self._mtime = mtime
+        self.loads += 1
+        self.load_seconds += time.perf_counter() - start
+
+    def _index(self):
+        try:
+            mtime = os.stat(self.index_path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._index_mtime:
+            return
+        with self._lock:
+            if mtime == self._index_mtime:
+                return
+            start = time.perf_counter()
+            by_display, by_name = {}, {}
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    index = json.load(f)
+                for kind, entries in (index.get("models") or {}).items():
+                    for name, entry in entries.items():
+                        by_display[(kind, entry.get("display", name))] = entry
+                        by_name[(kind, name)] = entry
+            except Exception:
+                pass
+            self._by_display, self._by_name = by_display, by_name
+            self._index_mtime = mtime
+            self.loads += 1
+            self.load_seconds += time.perf_counter() - start
+
+    def model_info(self, model: str, kind: str) -> Optional[Dict[str, Any]]:
+        """Index entry (capabilities, modalities, paid flag, limits, pricing...) for a dropdown or API name."""
+        self._index()
+        return self._by_display.get((kind, model)) or self._by_name.get((kind, model.strip()))
+
+    def resolve(self, model: str, kind: str) -> str:
+        """API model name for a dropdown value."""
+        info = self.model_info(model, kind)
+        if info:
+            return info["name"]
+        return model.replace(PAID_MARK, "").strip()
+
+
+_catalog = ModelCatalog()
+
+
+def get_catalog() -> ModelCatalog:
+    return _catalog
+
+
+# --- STARTUP / OBJECT_INFO TIMING ---
+
+_timings = {"import_seconds": None, "input_types": {}}
+_timings_lock = threading.Lock()
+
+
+def record_import_time(seconds: float):
+    _timings["import_seconds"] = seconds
+
+
+def timed_input_types(fn):
+    """Decorator for INPUT_TYPES (place under @classmethod) recording calls and time per node."""
+    @functools.wraps(fn)
+    def wrapper(cls):
+        start = time.perf_counter()
+        try:
+            return fn(cls)
+        finally:
+            elapsed = time.perf_counter() - start
+            with _timings_lock:
+                entry = _timings["input_types"].setdefault(cls.__name__, {"calls": 0, "total_ms": 0.0})
+                entry["calls"] += 1
+                entry["total_ms"] += elapsed * 1000
+    return wrapper
+
+
+def startup_report() -> Dict[str, Any]:
+    import sys
+    with _timings_lock:
+        input_types = {name: {"calls": e["calls"], "total_ms": round(e["total_ms"], 3),
+                              "avg_ms": round(e["total_ms"] / e["calls"], 3) if e["calls"] else 0.0}
+                       for name, e in _timings["input_types"].items()}
+    seconds = _timings["import_seconds"]
+    return {
+        "import_ms": round(seconds * 1000, 2) if seconds is not None else None,
+        "catalog": {"path": _catalog.path, "loads": _catalog.loads,
+                    "load_ms": round(_catalog.load_seconds * 1000, 3)},
+        "input_types": input_types,
+        "heavy_modules_loaded": {name: name in sys.modules for name in ("torch", "numpy", "PIL")},
+    }
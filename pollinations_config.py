@@ -0,0 +1,145 @@
+"""
+Shared access to pollinations_config.json.
+
+The file is loaded once into a thread-safe in-memory ConfigStore. Readers
+(every generation call, via get_api_key) never touch the disk; writers (the
+/pollinations/save_key route, the BYOP login node) update memory first and
+then persist atomically through a temp file + rename, so concurrent readers
+can never observe a half-written file. A background watcher reloads the
+store when the file is edited by hand.
+
+Besides the API key, the config file may carry optional tuning sections
+(e.g. "http") that the helper modules read through get_section().
+"""
+
+import json
+import os
+import tempfile
+import threading
+from typing import Any, Dict, Optional
+
+# POLLINATIONS_CONFIG_PATH points the extension at another file (e.g. the offline benchmarks)
+CONFIG_PATH = os.environ.get("POLLINATIONS_CONFIG_PATH") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "pollinations_config.json")
+WATCH_INTERVAL = 2.0
+
+
+class ConfigStore:
+    """Thread-safe, load-once view of a JSON config file with atomic writes and mtime-based reload."""
+
+    def __init__(self, path: str = CONFIG_PATH):
+        self.path = path
+        self._lock = threading.RLock()
+        self._data = None
+        self._mtime = None
+        self._watcher = None
+
+    def _stat_mtime(self) -> Optional[int]:
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def _read(self) -> Optional[Dict[str, Any]]:
+        """Parsed file contents, or None if it is missing or not valid JSON."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+                return data if isinstance(data, dict) else None
+        except Exception:
+            return None
+
+    def _ensure_loaded(self):
+        if self._data is None:
+            with self._lock:
+                if self._data is None:
+                    self._mtime = self._stat_mtime()
+                    self._data = self._read() or {}
+
+    def reload(self, force: bool = False) -> bool:
+        """Re-read the file if it changed on disk (or always with force). Returns True if reloaded."""
+        with self._lock:
+            mtime = self._stat_mtime()
+            if not force and self._data is not None and mtime == self._mtime:
+                return False
+            data = self._read()
+            if data is None:
+                # Missing or mid-edit: keep the last good state; a half-written
+                # file keeps its old mtime here so the next poll retries it
+                if self._data is None:
+                    self._data = {}
+                if mtime is None:
+                    self._mtime = None
+                return False
+            self._data = data
+            self._mtime = mtime
+            return True
+
+    def snapshot(self) -> Dict[str, Any]:
+        self._ensure_loaded()
+        return dict(self._data)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        self._ensure_loaded()
+        return self._data.get(key, default)
+
+    def update(self, **values: Any):
+        """Merge values into the config, in memory first, then atomically on disk."""
+        self._ensure_loaded()
+        with self._lock:
+            merged = dict(self._data)
+            merged.update(values)
+            self._data = merged
+            self._write_atomic(merged)
+            self._mtime = self._stat_mtime()
+
+    def _write_atomic(self, data: Dict[str, Any]):
+        directory = os.path.dirname(self.path) or "."
+        fd, tmp = tempfile.mkstemp(prefix=".pollinations_config.", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    def start_watching(self, interval: float = WATCH_INTERVAL):
+        """Poll the file's mtime in a daemon thread and reload on external edits."""
+        with self._lock:
+            if self._watcher is not None:
+                return
+            stop = threading.Event()
+
+            def watch():
+                while not stop.wait(interval):
+                    try:
+                        self.reload()
+                    except Exception:
+                        pass
+
+            self._watcher = threading.Thread(target=watch, name="pollinations-config-watch", daemon=True)
+            self._watcher.start()
+
+
+_store = ConfigStore()
+
+
+def get_config_store() -> ConfigStore:
+    return _store
+
+
+def load_config() -> Dict[str, Any]:
+    """Return a copy of the current config (empty dict if the file is missing/invalid)."""
+    return _store.snapshot()
+
+
+def get_section(name: str) -> Dict[str, Any]:
+    """Return a tuning section of the config (always a dict)."""
+    section = _store.get(name)
+    return section if isinstance(section, dict) else {}
@@ -0,0 +1,177 @@
+"""
+Hedged requests for the heavy-tailed image endpoint.
+
+If a request has not finished within a deadline derived from recent
+latencies (e.g. the p95 of the last 200 successful images of that model), a
+second request is fired: the same request again, or the same prompt on a
+fallback model. Whichever finishes first is used; the other one is
+cancelled by shutting down its connection, whether it is still waiting for
+the response or already downloading. The primary runs on the caller's
+thread and each hedge on a thread of its own, so hedges never queue behind
+a busy pool. A hedge costs a second generation whenever it fires (the server
+may keep generating the abandoned one), so it is off by default.
+
+Configured by the "hedge" entry of the "image" section:
+
+    "image": {"hedge": {"enabled": true, "percentile": 95, "min_samples": 20,
+                        "default_delay": 20, "min_delay": 2, "max_delay": 60,
+                        "fallback_model": "turbo"}}
+
+Outcomes (fired / primary_won / hedge_won / both_failed) are counted in
+/pollinations/metrics.
+"""
+
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+
+try:
+    from .pollinations_config import get_section
+    from .pollinations_http import CancelToken, RequestCancelled
+    from .pollinations_metrics import get_metrics
+except ImportError:  # executed as a standalone script
+    from pollinations_config import get_section
+    from pollinations_http import CancelToken, RequestCancelled
+    from pollinations_metrics import get_metrics
+
+DEFAULT_SETTINGS = {
+    "enabled": False,
+    "percentile": 95.0,
+    "min_samples": 20,
+    "window": 200,
+    "default_delay": 20.0,
+    "min_delay": 2.0,
+    "max_delay": 60.0,
+    "fallback_model": "",
+}
+
+
+class LatencyTracker:
+    """Sliding window of recent successful latencies per key (e.g. per model)."""
+
+    def __init__(self, window: int = 200):
+        self.window = window
+        self._lock = threading.Lock()
+        self._samples: Dict[str, deque] = {}
+
+    def record(self, key: str, seconds: float):
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def percentile(self, key: str, pct: float, min_samples: int = 1) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(key) or ())
+        if len(samples) < max(1, min_samples):
+            return None
+        index = min(len(samples) - 1, max(0, int(round(pct / 100.0 * len(samples))) - 1))
+        return samples[index]
+
+
+class HedgeCancelled(RequestCancelled):
+    """Raised inside the losing request once the other one has won."""
+
+
+def get_hedge_settings() -> Dict[str, Any]:
+    settings = dict(DEFAULT_SETTINGS)
+    settings.update(get_section("image").get("hedge") or {})
+    return settings
+
+
+def hedge_delay(key: str, settings: Dict[str, Any]) -> float:
+    """Seconds to wait before hedging: the configured percentile of recent latencies, clamped."""
+    observed = _tracker.percentile(key, float(settings["percentile"]), int(settings["min_samples"]))
+    delay = float(settings["default_delay"]) if observed is None else observed
+    return min(max(delay, float(settings["min_delay"])), float(settings["max_delay"]))
+
+
+def hedged_call(primary: Callable[[CancelToken], Any], hedge: Callable[[CancelToken], Any],
+                delay: float) -> Any:
+    """
+    Run primary(cancel) on this thread; if it is still running after `delay`
+    seconds, also run hedge(cancel) on a new thread and return whichever
+    succeeds first.
+
+    Each callable receives its own CancelToken; the loser's token is set,
+    which aborts the request it has in flight. If both fail (or the primary
+    fails before the hedge fired), the primary's exception is raised.
+    """
+    metrics = get_metrics()
+    cancels = {"primary": CancelToken(), "hedge": CancelToken()}
+    lock = threading.Lock()
+    state = {"fired": False, "settled": False, "winner": None}
+    hedge_result = Future()
+
+    def claim(name):
+        with lock:
+            if state["winner"] is None:
+                state["winner"] = name
+            won = state["winner"] == name
+        if won:
+            cancels["hedge" if name == "primary" else "primary"].set()
+        return won
+
+    def launch():
+        with lock:
+            if state["settled"]:
+                return
+            state["fired"] = True
+        metrics.count_hedge("fired")
+        try:
+            result = _run(hedge, cancels["hedge"])
+        except BaseException as e:
+            hedge_result.set_exception(e)
+            return
+        claim("hedge")
+        hedge_result.set_result(result)
+
+    timer = threading.Timer(delay, launch)
+    timer.name = "pollinations-hedge"
+    timer.daemon = True
+    timer.start()
+    try:
+        result = _run(primary, cancels["primary"])
+    except Exception as e:
+        with lock:
+            state["settled"] = True
+            fired = state["fired"]
+        if not fired:
+            raise
+        try:
+            result = hedge_result.result()
+        except Exception:
+            metrics.count_hedge("both_failed")
+            raise e
+        metrics.count_hedge("hedge_won")
+        return result
+    except BaseException:
+        cancels["hedge"].set()
+        raise
+    finally:
+        timer.cancel()
+
+    with lock:
+        state["settled"] = True
+        fired = state["fired"]
+    if not fired:
+        return result
+    if claim("primary"):
+        metrics.count_hedge("primary_won")
+        return result
+    metrics.count_hedge("hedge_won")  # both finished; the hedge got there first
+    return hedge_result.result()
+
+
+def _run(call: Callable[[CancelToken], Any], cancel: CancelToken) -> Any:
+    with cancel.scope():
+        return call(cancel)
+
+
+_tracker = LatencyTracker(DEFAULT_SETTINGS["window"])
+
+
+def get_latency_tracker() -> LatencyTracker:
+    return _tracker
@@ -0,0 +1,240 @@
+"""
+Shared HTTP transport for every Pollinations node, the uploader, the BYOP
+auth module and the model updater.
+
+A single process-wide requests.Session keeps TCP/TLS connections to
+gen.pollinations.ai, media.pollinations.ai and enter.pollinations.ai alive
+between node executions, so the handshake is paid once per host instead of
+once per request.
+
+Pool sizes and timeouts come from the optional "http" section of
+pollinations_config.json:
+
+    "http": {
+        "pool_connections": 8,        # number of per-host pools kept
+        "pool_maxsize": 16,           # keep-alive connections per host
+        "hosts": {"gen.pollinations.ai": 32},   # per-host overrides
+        "connect_timeout": 10,
+        "read_timeout": 120
+    }
+
+The three API hosts can be redirected (e.g. to the offline stand-in server
+in benchmarks/) with POLLINATIONS_GEN_BASE_URL / POLLINATIONS_MEDIA_BASE_URL /
+POLLINATIONS_ENTER_BASE_URL or an "endpoints" section:
+
+    "endpoints": {"gen": "http://127.0.0.1:8189"}
+
+Base URLs are read when the modules are imported.
+
+Requests issued inside a CancelToken.scope() can be aborted from another
+thread: setting the token shuts down the socket of the request in flight,
+whether it is still waiting for the response headers or reading the body.
+"""
+
+import contextlib
+import os
+import socket
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+try:
+    from .pollinations_config import get_section
+    from .pollinations_metrics import get_metrics
+except ImportError:  # executed as a standalone script
+    from pollinations_config import get_section
+    from pollinations_metrics import get_metrics
+
+DEFAULT_SETTINGS = {
+    "pool_connections": 8,
+    "pool_maxsize": 16,
+    "hosts": {},
+    "connect_timeout": 10.0,
+    "read_timeout": 120.0,
+}
+
+USER_AGENT = "Mozilla/5.0"
+
+BASE_URLS = {
+    "gen": "https://gen.pollinations.ai",      # image / text / audio / video generation, model lists
+    "media": "https://media.pollinations.ai",  # input-image uploads
+    "enter": "https://enter.pollinations.ai",  # BYOP device flow and account info
+}
+
+_session = None
+_settings = None
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def get_settings() -> Dict[str, Any]:
+    """Transport settings: defaults overlaid with the config "http" section (read once)."""
+    global _settings
+    if _settings is None:
+        settings = dict(DEFAULT_SETTINGS)
+        settings.update(get_section("http"))
+        _settings = settings
+    return _settings
+
+
+def base_url(name: str) -> str:
+    """Base URL of one API host: env override, then config "endpoints", then the public host."""
+    url = os.environ.get(f"POLLINATIONS_{name.upper()}_BASE_URL") or get_section("endpoints").get(name) or BASE_URLS[name]
+    return url.rstrip("/")
+
+
+def default_timeout(read: Optional[float] = None) -> Tuple[float, float]:
+    """(connect, read) timeout tuple as accepted by requests."""
+    settings = get_settings()
+    return (float(settings["connect_timeout"]), float(read if read is not None else settings["read_timeout"]))
+
+
+class PollinationsSession(requests.Session):
+    """requests.Session that never waits forever: applies the configured timeouts by default."""
+
+    def request(self, method, url, **kwargs):
+        if kwargs.get("timeout") is None:
+            kwargs["timeout"] = default_timeout()
+        return super().request(method, url, **kwargs)
+
+
+# --- CANCELLATION ---
+
+class RequestCancelled(Exception):
+    """Raised in a request whose CancelToken was set."""
+
+
+class CancelToken:
+    """
+    threading.Event-like flag that also aborts the requests made in its
+    scope(): set() shuts down the socket each of them is using.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._connections = set()
+
+    def is_set(self) -> bool:
+        return self._event.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._event.wait(timeout)
+
+    def set(self):
+        with self._lock:
+            self._event.set()
+            connections, self._connections = self._connections, set()
+        for conn in connections:
+            _abort(conn, self)
+
+    @contextlib.contextmanager
+    def scope(self):
+        """Attach the token to the requests issued by this thread inside the with-block."""
+        previous = getattr(_local, "token", None)
+        _local.token = self
+        try:
+            yield self
+        finally:
+            _local.token = previous
+            with self._lock:
+                self._connections.clear()
+
+    def _attach(self, conn):
+        with self._lock:
+            if not self._event.is_set():
+                self._connections.add(conn)
+                return
+        _abort(conn, self)
+
+
+def current_token() -> Optional[CancelToken]:
+    """The CancelToken whose scope the calling thread is in, if any."""
+    return getattr(_local, "token", None)
+
+
+def _abort(conn, token: CancelToken):
+    # The connection may have gone back to the pool and been taken by another request since
+    if getattr(conn, "cancel_token", None) is not token or conn.sock is None:
+        return
+    try:
+        conn.sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+# --- CONNECT TIMING ---
+# New pooled connections report DNS + TCP (+ TLS) setup time as the "connect" stage.
+# Every request also binds its connection to the calling thread's CancelToken.
+
+class _TimedConnection:
+    cancel_token = None
+
+    def connect(self):
+        start = time.perf_counter()
+        super().connect()
+        get_metrics().observe("connect", time.perf_counter() - start)
+        if self.cancel_token is not None and self.cancel_token.is_set():
+            _abort(self, self.cancel_token)  # cancelled while connecting
+
+    def request(self, *args, **kwargs):
+        token = current_token()
+        if token is not None and token.is_set():
+            raise RequestCancelled("request cancelled before it was sent")
+        self.cancel_token = token
+        if token is not None:
+            token._attach(self)
+        return super().request(*args, **kwargs)
+
+
+class TimedHTTPConnection(_TimedConnection, HTTPConnection):
+    pass
+
+
+class TimedHTTPSConnection(_TimedConnection, HTTPSConnection):
+    pass
+
+
+class TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+
+class TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+
+class InstrumentedAdapter(HTTPAdapter):
+    """HTTPAdapter whose pools use the timed connection classes."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": TimedHTTPConnectionPool,
+                                                   "https": TimedHTTPSConnectionPool}
+
+
+def _build_session() -> PollinationsSession:
+    settings = get_settings()
+    session = PollinationsSession()
+    session.headers["User-Agent"] = USER_AGENT
+    adapter = InstrumentedAdapter(pool_connections=int(settings["pool_connections"]),
+                                  pool_maxsize=int(settings["pool_maxsize"]))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    for host, maxsize in (settings.get("hosts") or {}).items():
+        session.mount(f"https://{host}", InstrumentedAdapter(pool_connections=1, pool_maxsize=int(maxsize)))
+    return session
+
+
+def get_session() -> PollinationsSession:
+    """The process-wide pooled session (created lazily, thread-safe)."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = _build_session()
+    return _session
@@ -0,0 +1,256 @@
+"""
+Low-copy, memory-bounded decode path from HTTP bytes to ComfyUI IMAGE tensors.
+
+The naive chain (r.content -> BytesIO -> PIL -> convert -> np.array ->
+astype(float32) -> / 255 -> torch) holds up to ~35 bytes per pixel at peak.
+This module instead:
+
+- streams the response body into a reusable buffer borrowed from a small
+  shared pool (no r.content / BytesIO copies of the encoded payload),
+- decodes once with PIL, optionally using draft()/reduce() to decode
+  straight to a smaller size,
+- exposes the pixels as a single uint8 array and releases the PIL image,
+- normalizes into the preallocated float32 output in one pass.
+
+Peak usage is roughly max(PIL + uint8, uint8 + float32) ~= 15 bytes per pixel.
+
+While the body streams in, DownloadProgress drives ComfyUI's progress bar and,
+for JPEG results, periodically decodes the partial body (straight from the
+same buffer, at reduced size) into a small thumbnail that ComfyUI shows as the
+node's preview.
+"""
+
+import contextlib
+import io
+import math
+import re
+import threading
+import time
+import warnings
+
+import numpy as np
+import torch
+from PIL import Image
+
+from .pollinations_hedge import HedgeCancelled
+from .pollinations_metrics import get_metrics
+
+CHUNK_SIZE = 256 * 1024
+JPEG_EOI = b"\xff\xd9"
+PREVIEW_MAX_SIZE = 512
+PREVIEW_INTERVAL = 0.5
+# Idle buffers kept for reuse, in total; a returned buffer that would exceed this is dropped
+MAX_POOLED_BYTES = 32 * 1024 * 1024
+
+_pool = []
+_pool_lock = threading.Lock()
+
+# np.asarray(img) is a read-only view of PIL's pixel bytes; torch only reads it
+# (into the float32 output), so its "not writable" warning is noise here. Making
+# the array writable would cost another full uint8 copy.
+warnings.filterwarnings("ignore", message="The given NumPy array is not writable",
+                        category=UserWarning, module=re.escape(__name__) + "$")
+
+
+class ReusableBuffer:
+    """Growable bytearray that response bodies are streamed into, reused across calls."""
+
+    def __init__(self, capacity: int = 1024 * 1024):
+        self.data = bytearray(capacity)
+        self.size = 0
+
+    def reserve(self, capacity: int):
+        if capacity <= len(self.data):
+            return
+        grown = bytearray(max(capacity, 2 * len(self.data)))
+        grown[:self.size] = memoryview(self.data)[:self.size]
+        self.data = grown
+
+    def append(self, chunk):
+        end = self.size + len(chunk)
+        self.reserve(end)
+        self.data[self.size:end] = chunk
+        self.size = end
+
+    def view(self) -> memoryview:
+        return memoryview(self.data)[:self.size]
+
+
+@contextlib.contextmanager
+def borrow_buffer():
+    """
+    An emptied buffer from the shared pool, returned to it on exit. The pool
+    is bounded by total size rather than by thread, so a burst of large
+    images on many worker threads does not stay resident afterwards. Views of
+    the buffer must not be used after the with-block.
+    """
+    with _pool_lock:
+        buf = _pool.pop() if _pool else ReusableBuffer()
+    buf.size = 0
+    try:
+        yield buf
+    finally:
+        with _pool_lock:
+            if len(buf.data) + sum(len(b.data) for b in _pool) <= MAX_POOLED_BYTES:
+                _pool.append(buf)
+
+
+def read_response(response, buf: ReusableBuffer, cancel=None, on_chunk=None) -> memoryview:
+    """
+    Stream a requests response (stream=True) into buf; returns a view of the body.
+
+    cancel: optional CancelToken (or threading.Event); once set, the download
+    stops with HedgeCancelled (a CancelToken also shuts the socket down, so
+    this happens at once rather than at the next chunk).
+    on_chunk: optional callable(buf, total_or_None) called after every chunk.
+    """
+    length = response.headers.get("Content-Length")
+    total = int(length) if length and length.isdigit() else None
+    if total:
+        buf.reserve(total)
+    try:
+        for chunk in response.iter_content(CHUNK_SIZE):
+            if cancel is not None and cancel.is_set():
+                raise HedgeCancelled("download abandoned: the other request won")
+            buf.append(chunk)
+            if on_chunk is not None:
+                on_chunk(buf, total)
+    except HedgeCancelled:
+        raise
+    except Exception as e:
+        if cancel is not None and cancel.is_set():
+            raise HedgeCancelled("download abandoned: the other request won") from e
+        raise
+    return buf.view()
+
+
+def decode_preview(view: memoryview, max_size: int = PREVIEW_MAX_SIZE):
+    """
+    Thumbnail (PIL RGB image) of a possibly incomplete JPEG, or None if
+    nothing decodes yet.
+
+    Like PIL.ImageFile.Parser, the received bytes are fed straight to the
+    image's decoder (ended with an EOI marker), so a truncated body never needs
+    the process-global LOAD_TRUNCATED_IMAGES switch. draft() lets JPEG decode
+    at preview size; other formats (PNG cannot be scaled down while decoding)
+    get no preview.
+    """
+    try:
+        img = Image.open(ViewReader(view))
+        if img.format != "JPEG" or len(img.tile) != 1:
+            return None
+        img.draft("RGB", (max_size, max_size))
+        img.load_prepare()
+        codec, extents, offset, args = img.tile[0]
+        decoder = Image._getdecoder(img.mode, codec, args, img.decoderconfig)
+        decoder.setimage(img.im, extents)
+        try:
+            decoder.decode(b"".join((view[offset:], JPEG_EOI)))
+        finally:
+            decoder.cleanup()
+        img.tile = []
+        img.thumbnail((max_size, max_size))
+        return img.convert("RGB") if img.mode != "RGB" else img
+    except Exception:
+        return None
+
+
+class DownloadProgress:
+    """
+    on_chunk callback for read_response: reports bytes received to a ComfyUI
+    progress bar and, every `interval` seconds, attaches a thumbnail of the
+    partial image as the node preview. Outside ComfyUI it only counts.
+    """
+
+    def __init__(self, node_id=None, max_size: int = PREVIEW_MAX_SIZE, interval: float = PREVIEW_INTERVAL):
+        self.max_size = max_size
+        self.interval = interval
+        self.previews = 0
+        self._next_preview = 0.0
+        self._pbar = None
+        try:
+            import comfy.utils
+            try:
+                self._pbar = comfy.utils.ProgressBar(100, node_id=node_id)
+            except TypeError:  # ComfyUI versions without per-node progress bars
+                self._pbar = comfy.utils.ProgressBar(100)
+        except ImportError:
+            pass
+
+    def __call__(self, buf: ReusableBuffer, total):
+        preview = None
+        now = time.perf_counter()
+        if self.max_size and now >= self._next_preview and buf.size != total:
+            self._next_preview = now + self.interval
+            img = decode_preview(buf.view(), self.max_size)
+            if img is not None:
+                self.previews += 1
+                preview = ("JPEG", img, self.max_size)
+        if self._pbar is not None and (total or preview is not None):
+            if total:
+                self._pbar.update_absolute(min(buf.size, total), total, preview)
+            else:
+                self._pbar.update_absolute(0, 100, preview)
+
+
+class ViewReader(io.RawIOBase):
+    """Seekable read-only file object over a memoryview (BytesIO would copy it)."""
+
+    def __init__(self, view: memoryview):
+        self._view = view
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        n = max(0, min(len(b), len(self._view) - self._pos))
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._view)}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+
+def decode_to_tensor(source, max_side: int = 0) -> torch.Tensor:
+    """
+    Decode an encoded image into a [1, H, W, 3] float32 IMAGE tensor.
+
+    Args:
+        source: file path, binary file object or bytes-like/memoryview
+        max_side: if > 0, decode to at most this many pixels on the longest
+                  side using JPEG DCT scaling (draft) or integer reduce()
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = ViewReader(memoryview(source))
+    metrics = get_metrics()
+    start = time.perf_counter()
+    img = Image.open(source)
+    try:
+        if max_side and max(img.size) > max_side:
+            scale = max_side / max(img.size)
+            img.draft("RGB", (math.ceil(img.size[0] * scale), math.ceil(img.size[1] * scale)))
+            factor = math.ceil(max(img.size) / max_side)
+            if factor > 1:
+                img = img.reduce(factor)
+        if img.mode != "RGB":
+            img = img.convert("RGB")
+        pixels = np.asarray(img)
+    finally:
+        img.close()
+    decoded = time.perf_counter()
+    metrics.observe("decode", decoded - start)
+    height, width = pixels.shape[:2]
+    out = torch.empty((1, height, width, 3), dtype=torch.float32)
+    torch.div(torch.from_numpy(pixels), 255.0, out=out[0])
+    metrics.observe("tensor", time.perf_counter() - decoded)
+    return out
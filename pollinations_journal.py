@@ -0,0 +1,342 @@
+"""
+Durable journal of generation requests, with resume after a crash.
+
+Every Image / Text / Audio / Video generation appends JSON lines to an
+append-only file: a "pending" record with the request's normalized
+parameters when it starts, optional event-less "note" records adding
+parameters learned on the way (e.g. the uploaded input image URL), and a final
+"completed" record (elapsed time, cache key, path of the cached result) or
+"failed" record (error). Lines are written as they happen and fsync'd in
+batches every `fsync_interval` seconds (0 = after every record), so a crash
+loses at most that much.
+
+resume() folds the journal into one state per entry and re-issues only the
+entries whose last record is pending or failed; completed ones are skipped
+(their results are already in the local caches). Re-issued requests keep
+their entry id, so a second resume after success has nothing left to do.
+
+Configured by the "journal" section of pollinations_config.json:
+
+    "journal": {"enabled": true, "path": "journal/pollinations_requests.jsonl",
+                "fsync_interval": 1.0, "resume_concurrency": 4}
+
+The path is relative to the extension folder. API keys are never written.
+"""
+
+import atexit
+import contextlib
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+try:
+    from .pollinations_config import get_section
+    from .pollinations_metrics import get_metrics
+except ImportError:  # executed as a standalone script
+    from pollinations_config import get_section
+    from pollinations_metrics import get_metrics
+
+EXTENSION_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_SETTINGS = {
+    "enabled": False,
+    "path": "journal/pollinations_requests.jsonl",
+    "fsync_interval": 1.0,
+    "resume_concurrency": 4,
+}
+RESUMABLE = ("pending", "failed")
+
+
+class ReplayUnavailable(Exception):
+    """Raised by a replayer when an entry cannot be re-issued (e.g. its input image is gone)."""
+
+
+class JournalEntry:
+    """Handle of one journaled request; a disabled journal hands out entries that write nothing."""
+
+    def __init__(self, journal: Optional["Journal"], entry_id: str):
+        self.journal = journal
+        self.id = entry_id
+        self.result: Dict[str, Any] = {}
+
+    def note(self, **params):
+        """Record parameters learned while the request runs; the entry's status is unchanged."""
+        if self.journal is not None:
+            self.journal.append({"id": self.id, "params": params})
+
+    def set_result(self, **result):
+        """Attach result details (cache key, path, url) to the completed record."""
+        self.result.update({k: v for k, v in result.items() if v is not None})
+
+
+class Journal:
+    """Append-only JSONL writer with batched fsync, plus folding and resume."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._file = None
+        self._path = None
+        self._dirty = False
+        self._flusher = None
+        self._wake = threading.Event()
+        self._active = set()
+        self._replayers: Dict[str, Callable[[Dict[str, Any]], None]] = {}
+        self._resume_lock = threading.Lock()
+        self.resume_status: Dict[str, Any] = {"running": False}
+
+    # --- WRITING ---
+
+    def settings(self) -> Dict[str, Any]:
+        settings = dict(DEFAULT_SETTINGS)
+        settings.update(get_section("journal"))
+        return settings
+
+    def path(self) -> str:
+        return os.path.join(EXTENSION_DIR, self.settings()["path"])
+
+    def append(self, record: Dict[str, Any]):
+        settings = self.settings()
+        path = os.path.join(EXTENSION_DIR, settings["path"])
+        interval = float(settings["fsync_interval"])
+        line = json.dumps(dict(record, ts=round(time.time(), 3)), ensure_ascii=False) + "\n"
+        try:
+            with self._lock:
+                if self._path != path:
+                    self._close_file()
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    self._file = open(path, "a", encoding="utf-8")
+                    self._path = path
+                    if _ends_torn(path):
+                        self._file.write("\n")  # a crash cut the last line short; don't glue onto it
+                self._file.write(line)
+                self._dirty = True
+                if interval <= 0:
+                    self._sync()
+            if interval > 0:
+                self._start_flusher()
+        except OSError:
+            get_metrics().count_error("journal_write")
+
+    def _sync(self):
+        # Caller holds self._lock
+        if self._file is not None and self._dirty:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._dirty = False
+
+    def _close_file(self):
+        # Caller holds self._lock
+        if self._file is not None:
+            self._sync()
+            self._file.close()
+            self._file = None
+            self._path = None
+
+    def flush(self):
+        try:
+            with self._lock:
+                self._sync()
+        except OSError:
+            get_metrics().count_error("journal_write")
+
+    def _start_flusher(self):
+        if self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is not None:
+                return
+
+            def run():
+                while True:
+                    self._wake.wait(max(float(self.settings()["fsync_interval"]), 0.05))
+                    self._wake.clear()
+                    self.flush()
+
+            self._flusher = threading.Thread(target=run, name="pollinations-journal", daemon=True)
+            self._flusher.start()
+
+    def close(self):
+        try:
+            with self._lock:
+                self._close_file()
+        except OSError:
+            pass
+
+    @contextlib.contextmanager
+    def track(self, kind: str, params: Dict[str, Any], entry_id: Optional[str] = None):
+        """
+        Journal one request around the with-block: pending on entry, completed
+        (with the entry's result) on normal exit, failed when it raises.
+        entry_id continues an existing entry (used by resume()).
+        """
+        entry_id = entry_id or getattr(_replaying, "entry_id", None)
+        if not self.settings()["enabled"]:
+            yield JournalEntry(None, entry_id or "")
+            return
+        entry = JournalEntry(self, entry_id or uuid.uuid4().hex)
+        with self._lock:
+            self._active.add(entry.id)
+        self.append({"id": entry.id, "event": "pending", "kind": kind, "params": params})
+        start = time.perf_counter()
+        try:
+            yield entry
+        except BaseException as e:
+            self.append({"id": entry.id, "event": "failed", "elapsed": round(time.perf_counter() - start, 3),
+                         "error": f"{type(e).__name__}: {e}"})
+            raise
+        else:
+            self.append(dict({"id": entry.id, "event": "completed", "elapsed": round(time.perf_counter() - start, 3)},
+                             **entry.result))
+        finally:
+            with self._lock:
+                self._active.discard(entry.id)
+
+    # --- READING ---
+
+    def read(self, path: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Fold the journal into {entry id: latest state}; a torn last line is ignored."""
+        return fold(_read_lines(path or self.path()))
+
+    def summary(self, limit: int = 100) -> Dict[str, Any]:
+        settings = self.settings()
+        entries = self.read() if os.path.exists(self.path()) else {}
+        counts: Dict[str, int] = {}
+        for entry in entries.values():
+            counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+        open_entries = [{k: e.get(k) for k in ("id", "kind", "status", "ts", "error")}
+                        for e in entries.values() if e["status"] in RESUMABLE]
+        return {"enabled": bool(settings["enabled"]), "path": settings["path"], "entries": len(entries),
+                "counts": counts, "open": open_entries[:limit], "resume": dict(self.resume_status)}
+
+    def compact(self):
+        """Rewrite the journal with one line per entry (its folded state), atomically."""
+        path = self.path()
+        if not os.path.exists(path):
+            return
+        with self._lock:
+            self._close_file()
+            entries = fold(_read_lines(path))
+            tmp = path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for entry in entries.values():
+                    record = {k: v for k, v in entry.items() if k != "status"}
+                    record["event"] = entry["status"]
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+
+    # --- RESUME ---
+
+    def register_replayer(self, kind: str, replayer: Callable[[Dict[str, Any]], None]):
+        """replayer(params) re-issues one request of `kind` (inside resume(), it is journaled under its old id)."""
+        self._replayers[kind] = replayer
+
+    def resume(self, kinds: Optional[Iterable[str]] = None, include_failed: bool = True,
+               limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Re-issue the journal's pending (and, by default, failed) entries.
+        Entries currently running in this process and kinds without a
+        replayer are left alone. Returns counts of the outcomes.
+        """
+        if not self.settings()["enabled"]:
+            raise RuntimeError("the request journal is disabled (journal.enabled in pollinations_config.json)")
+        if not self._resume_lock.acquire(blocking=False):
+            raise RuntimeError("a journal resume is already running")
+        try:
+            self.compact()
+            statuses = RESUMABLE if include_failed else ("pending",)
+            kinds = set(kinds) if kinds else set(self._replayers)
+            with self._lock:
+                active = set(self._active)
+            todo = [e for e in self.read().values()
+                    if e["status"] in statuses and e.get("kind") in kinds and e["id"] not in active]
+            if limit is not None:
+                todo = todo[:limit]
+            status = self.resume_status = {"running": True, "total": len(todo), "completed": 0,
+                                           "failed": 0, "skipped": 0}
+            lock = threading.Lock()
+
+            def run(entry):
+                outcome = "completed"
+                _replaying.entry_id = entry["id"]
+                try:
+                    self._replayers[entry["kind"]](entry.get("params") or {})
+                except ReplayUnavailable as e:
+                    outcome = "skipped"
+                    self.append({"id": entry["id"], "event": "abandoned", "error": str(e)})
+                except Exception:
+                    outcome = "failed"  # already journaled by track()
+                finally:
+                    _replaying.entry_id = None
+                with lock:
+                    status[outcome] += 1
+
+            with ThreadPoolExecutor(max_workers=max(1, int(self.settings()["resume_concurrency"])),
+                                    thread_name_prefix="pollinations-resume") as pool:
+                list(pool.map(run, todo))
+            status["running"] = False
+            return dict(status)
+        finally:
+            self.resume_status["running"] = False
+            self._resume_lock.release()
+
+
+def _ends_torn(path: str) -> bool:
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        if f.tell() == 0:
+            return False
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) != b"\n"
+
+
+def _read_lines(path: str) -> List[Dict[str, Any]]:
+    records = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue  # torn write from a crash
+    except FileNotFoundError:
+        pass
+    return records
+
+
+def fold(records: Iterable[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Merge journal records by id: params accumulate, the last event becomes
+    the status. Notes carry no event, so a request that crashed mid-download
+    stays pending.
+    """
+    entries: Dict[str, Dict[str, Any]] = {}
+    for record in records:
+        entry_id = record.get("id")
+        if not entry_id:
+            continue
+        entry = entries.setdefault(entry_id, {"id": entry_id, "params": {}})
+        for key, value in record.items():
+            if key == "params":
+                entry["params"].update(value or {})
+            elif key == "event":
+                entry["status"] = value
+            else:
+                entry[key] = value
+        if record.get("event") == "completed":
+            entry.pop("error", None)
+    return {k: v for k, v in entries.items() if "status" in v}
+
+
+_replaying = threading.local()
+_journal = Journal()
+atexit.register(_journal.close)
+
+
+def get_journal() -> Journal:
+    return _journal
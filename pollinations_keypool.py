@@ -0,0 +1,249 @@
+"""
+Pool of Pollinations API keys with balance-aware load balancing.
+
+With several accounts configured, requests are spread over their keys so
+throughput is no longer capped by one account's rate limit and Pollen
+balance. Configured in pollinations_config.json:
+
+    "api_keys": ["sk_first", {"key": "sk_second", "weight": 2}],
+    "key_pool": {
+        "strategy": "least_in_flight",   # or "weighted_round_robin"
+        "balance_refresh": 300,          # seconds between balance checks (0 = never)
+        "min_balance": 0,                # keys at or below this balance are drained
+        "drain_seconds": 60,             # default pause after a 429
+        "auth_drain_seconds": 3600,      # pause after a 401 / 402
+        "reservation_seconds": 10        # how long a pick counts as load before its request starts
+    }
+
+The node picks a key with pick(), which reserves a slot on it so picks made
+at nearly the same moment spread over the keys; the scheduler reports every
+request made with a pooled key through begin() (which consumes the
+reservation) and end(), which keep the in-flight counts and drain keys that
+answer 401 (invalid), 402 (out of Pollen) or 429 (rate limited). Balances come from BYOPAuth.get_user_info() on a background
+thread, never per request. Keys never leave this module in stats(): they
+are identified by a short hash.
+"""
+
+import hashlib
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+try:
+    from .pollinations_config import get_config_store, get_section
+except ImportError:  # executed as a standalone script
+    from pollinations_config import get_config_store, get_section
+
+DEFAULT_SETTINGS = {
+    "strategy": "least_in_flight",
+    "balance_refresh": 300.0,
+    "min_balance": 0.0,
+    "drain_seconds": 60.0,
+    "auth_drain_seconds": 3600.0,
+    "reservation_seconds": 10.0,
+}
+STRATEGIES = ("least_in_flight", "weighted_round_robin")
+DRAIN_STATUSES = {401, 402, 429}
+
+
+def key_id(api_key: str) -> str:
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+class PooledKey:
+    """One key's weight, load, counters and drain state."""
+
+    def __init__(self, api_key: str, weight: float = 1.0):
+        self.key = api_key
+        self.id = key_id(api_key)
+        self.weight = max(float(weight), 0.01)
+        self.in_flight = 0
+        self.reservations = deque()  # expiry times of picks whose request has not begun yet
+        self.requests = 0
+        self.statuses: Dict[str, int] = {}
+        self.balance: Optional[float] = None
+        self.balance_checked: Optional[float] = None
+        self.drained_until = 0.0
+        self.drain_reason = ""
+        self.current = 0.0  # smooth weighted round-robin state
+
+    def available(self, now: float) -> bool:
+        return self.drained_until <= now
+
+    def load(self, now: float) -> int:
+        """Requests in flight plus unexpired reservations (picks that may not lead to a request, e.g. cache hits)."""
+        while self.reservations and self.reservations[0] <= now:
+            self.reservations.popleft()
+        return self.in_flight + len(self.reservations)
+
+    def stats(self, now: float) -> Dict[str, Any]:
+        return {"id": self.id, "weight": self.weight, "in_flight": self.in_flight,
+                "reserved": self.load(now) - self.in_flight, "requests": self.requests,
+                "statuses": dict(self.statuses), "balance": self.balance,
+                "balance_age": round(now - self.balance_checked, 1) if self.balance_checked else None,
+                "drained": not self.available(now), "drain_reason": "" if self.available(now) else self.drain_reason}
+
+
+class KeyPool:
+    """Thread-safe key selection (least in-flight or smooth weighted round-robin) with draining."""
+
+    def __init__(self, entries: List[Any], settings: Optional[Dict[str, Any]] = None):
+        self.settings = dict(DEFAULT_SETTINGS)
+        self.settings.update(settings or {})
+        if self.settings["strategy"] not in STRATEGIES:
+            self.settings["strategy"] = "least_in_flight"
+        self._lock = threading.Lock()
+        self._keys: Dict[str, PooledKey] = {}
+        for entry in entries:
+            api_key, weight = (entry.get("key"), entry.get("weight", 1)) if isinstance(entry, dict) else (entry, 1)
+            if isinstance(api_key, str) and api_key.strip() and api_key.strip() not in self._keys:
+                self._keys[api_key.strip()] = PooledKey(api_key.strip(), weight)
+        self._refresher = None
+        self._stop = threading.Event()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def owns(self, api_key: Optional[str]) -> bool:
+        return bool(api_key) and api_key in self._keys
+
+    def pick(self, exclude: Optional[str] = None) -> Optional[str]:
+        """
+        Choose a key for the next request and reserve a slot on it; drained
+        keys are used only if every key is drained.
+        """
+        self._start_refresher()
+        now = time.time()
+        with self._lock:
+            candidates = [k for k in self._keys.values() if k.key != exclude]
+            if not candidates:
+                return None
+            ready = [k for k in candidates if k.available(now)]
+            if not ready:
+                # Everything is drained: fall back to the key that recovers first
+                return min(candidates, key=lambda k: k.drained_until).key
+            if self.settings["strategy"] == "weighted_round_robin":
+                total = sum(k.weight for k in ready)
+                for k in ready:
+                    k.current += k.weight
+                chosen = max(ready, key=lambda k: k.current)
+                chosen.current -= total
+            else:
+                chosen = min(ready, key=lambda k: (k.load(now) / k.weight, k.requests / k.weight))
+            chosen.reservations.append(now + float(self.settings["reservation_seconds"]))
+            return chosen.key
+
+    def has_alternative(self, api_key: str) -> bool:
+        now = time.time()
+        with self._lock:
+            return any(k.available(now) for k in self._keys.values() if k.key != api_key)
+
+    def begin(self, api_key: str):
+        with self._lock:
+            entry = self._keys.get(api_key)
+            if entry is not None:
+                if entry.reservations:
+                    entry.reservations.popleft()
+                entry.in_flight += 1
+                entry.requests += 1
+
+    def end(self, api_key: str, status: Optional[int], retry_after: Optional[float] = None):
+        with self._lock:
+            entry = self._keys.get(api_key)
+            if entry is None:
+                return
+            entry.in_flight = max(0, entry.in_flight - 1)
+            label = str(status) if status is not None else "error"
+            entry.statuses[label] = entry.statuses.get(label, 0) + 1
+            if status in DRAIN_STATUSES:
+                if status == 429:
+                    pause = retry_after if retry_after else float(self.settings["drain_seconds"])
+                else:
+                    pause = float(self.settings["auth_drain_seconds"])
+                self._drain(entry, pause, {401: "unauthorized", 402: "out of pollen", 429: "rate limited"}[status])
+
+    def _drain(self, entry: PooledKey, seconds: float, reason: str):
+        entry.drained_until = max(entry.drained_until, time.time() + seconds)
+        entry.drain_reason = reason
+
+    # --- BALANCES ---
+
+    def refresh_balances(self):
+        """Re-read every key's balance (bypassing the user-info cache) and drain empty keys."""
+        try:
+            from .byop_auth import BYOPAuth
+        except ImportError:  # executed as a standalone script
+            from byop_auth import BYOPAuth
+        auth = BYOPAuth()
+        min_balance = float(self.settings["min_balance"])
+        for entry in list(self._keys.values()):
+            info = auth.get_user_info(entry.key, max_age=0)
+            if not info or info.get("balance") is None:
+                continue
+            with self._lock:
+                entry.balance = float(info["balance"])
+                entry.balance_checked = time.time()
+                if entry.balance <= min_balance:
+                    self._drain(entry, float(self.settings["balance_refresh"]) or float(self.settings["auth_drain_seconds"]),
+                                "balance exhausted")
+                elif entry.drain_reason in ("balance exhausted", "out of pollen"):
+                    entry.drained_until = 0.0
+                    entry.drain_reason = ""
+
+    def _start_refresher(self):
+        interval = float(self.settings["balance_refresh"])
+        if interval <= 0 or self._refresher is not None:
+            return
+        with self._lock:
+            if self._refresher is not None:
+                return
+
+            def run():
+                while True:
+                    try:
+                        self.refresh_balances()
+                    except Exception as e:
+                        print(f"[Pollinations] Key balance refresh failed: {e}")
+                    if self._stop.wait(interval):
+                        return
+
+            self._refresher = threading.Thread(target=run, name="pollinations-key-balances", daemon=True)
+            self._refresher.start()
+
+    def close(self):
+        self._stop.set()
+
+    def stats(self) -> List[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            return [k.stats(now) for k in self._keys.values()]
+
+
+_pool = None
+_pool_signature = None
+_pool_lock = threading.Lock()
+
+
+def get_key_pool() -> Optional[KeyPool]:
+    """The pool built from the config's "api_keys" (rebuilt when they change), or None without one."""
+    global _pool, _pool_signature
+    entries = get_config_store().get("api_keys") or []
+    if not isinstance(entries, list) or not entries:
+        entries = []
+    signature = repr((entries, get_section("key_pool")))
+    if signature == _pool_signature:
+        return _pool
+    with _pool_lock:
+        if signature != _pool_signature:
+            if _pool is not None:
+                _pool.close()
+            pool = KeyPool(entries, get_section("key_pool"))
+            _pool = pool if len(pool) else None
+            _pool_signature = signature
+    return _pool
+
+
+def key_pool_stats() -> List[Dict[str, Any]]:
+    """Per-key stats of the current pool (empty without one)."""
+    return _pool.stats() if _pool is not None else []
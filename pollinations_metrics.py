@@ -0,0 +1,340 @@
+"""
+Hot-path instrumentation for the Pollinations nodes.
+
+A process-wide Metrics registry collects:
+
+- per-stage latency histograms: key_lookup, upload_encode, upload_post,
+  connect (DNS + TCP + TLS, from the pooled transport), ttfb, download,
+  decode and tensor,
+- response counts per route, model and status code (one per attempt, so
+  retried 429/5xx answers show up too),
+- bytes sent / received per route,
+- estimated Pollen spend per model,
+- failures that the nodes deliberately swallow (e.g. a cache write error),
+- calls that were coalesced into an identical in-flight request,
+- hedged-request outcomes (fired, primary_won, hedge_won, both_failed).
+
+GET /pollinations/metrics serves a JSON snapshot (plus cache hit rates), or
+the Prometheus text format with ?format=prometheus.
+
+Configured by the optional "metrics" section of pollinations_config.json:
+
+    "metrics": {"request_log": "logs/pollinations_requests.log.jsonl",
+                "pollen_per_request": {"flux": 0.0}}
+
+request_log (relative to the extension folder) appends one JSON line per
+finished API request for offline analysis. Pollen spend is an estimate: a
+configured per-request price wins, otherwise the "pricing" the model list
+reports (per text token, per image) is used.
+"""
+
+import contextlib
+import json
+import os
+import threading
+import time
+import urllib.parse
+from collections import defaultdict
+from typing import Any, Dict, Optional
+
+try:
+    from .pollinations_config import get_section
+except ImportError:  # executed as a standalone script
+    from pollinations_config import get_section
+
+EXTENSION_DIR = os.path.dirname(os.path.abspath(__file__))
+
+STAGES = ("key_lookup", "upload_encode", "upload_post", "connect", "ttfb", "download", "decode", "tensor")
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+# Path prefixes whose next segment is user content (the prompt), dropped from route labels
+CONTENT_ROUTES = {"image", "audio", "video", "text", "prompt"}
+
+
+def route_of(url: str) -> str:
+    """Low-cardinality label for a request URL: host + path without prompts, query or keys."""
+    parts = urllib.parse.urlsplit(url)
+    segments = [s for s in parts.path.split("/") if s]
+    if len(segments) >= 2 and segments[0] in CONTENT_ROUTES and segments[1] != "models":
+        segments = segments[:1]
+    return f"{parts.netloc}/{'/'.join(segments[:3])}"
+
+
+def model_of(url: str, payload: Any = None) -> str:
+    """Model named by a request: the ?model= query parameter or a JSON body's "model"."""
+    model = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query).get("model")
+    if model:
+        return model[0]
+    if isinstance(payload, dict) and payload.get("model"):
+        return str(payload["model"])
+    return ""
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram (Prometheus layout)."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def cumulative(self):
+        total, out = 0, []
+        for count in self.counts:
+            total += count
+            out.append(total)
+        return out
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bucket bound below which a fraction q of the observations fall."""
+        if not self.count:
+            return None
+        target = q * self.count
+        for bound, seen in zip(self.buckets, self.cumulative()):
+            if seen >= target:
+                return bound
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"count": self.count, "sum": round(self.sum, 6),
+                "avg": round(self.sum / self.count, 6) if self.count else None,
+                "max": round(self.max, 6), "p50": self.quantile(0.5), "p95": self.quantile(0.95)}
+
+
+class Metrics:
+    """Thread-safe registry of stage timings, response counts, bytes, spend and swallowed errors."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._log_lock = threading.Lock()
+        self._log_file = None
+        self._log_path = None
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.stages = defaultdict(Histogram)
+            self.responses = defaultdict(int)        # (route, model, status) -> count
+            self.bytes = defaultdict(lambda: [0, 0])  # route -> [sent, received]
+            self.spend = defaultdict(float)          # model -> estimated Pollen
+            self.errors = defaultdict(int)           # where -> count
+            self.coalesced = defaultdict(int)        # single-flight group -> calls that waited
+            self.hedges = defaultdict(int)           # outcome -> count
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            self.stages[stage].observe(seconds)
+
+    @contextlib.contextmanager
+    def timed(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def record_response(self, route: str, model: str, status: Optional[int]):
+        with self._lock:
+            self.responses[(route, model, str(status) if status is not None else "error")] += 1
+
+    def add_bytes(self, route: str, sent: int = 0, received: int = 0):
+        with self._lock:
+            counters = self.bytes[route]
+            counters[0] += sent
+            counters[1] += received
+
+    def record_spend(self, model: str, pollen: float):
+        if pollen:
+            with self._lock:
+                self.spend[model] += pollen
+
+    def count_error(self, where: str):
+        with self._lock:
+            self.errors[where] += 1
+
+    def count_coalesced(self, group: str):
+        with self._lock:
+            self.coalesced[group] += 1
+
+    def count_hedge(self, outcome: str):
+        with self._lock:
+            self.hedges[outcome] += 1
+
+    def log_request(self, record: Dict[str, Any]):
+        """Append one JSON line to the configured request log (no-op when disabled)."""
+        path = get_section("metrics").get("request_log")
+        if not path:
+            return
+        path = os.path.join(EXTENSION_DIR, path)
+        line = json.dumps(dict(record, ts=round(time.time(), 3)), ensure_ascii=False) + "\n"
+        try:
+            with self._log_lock:
+                if self._log_path != path:
+                    if self._log_file is not None:
+                        self._log_file.close()
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    self._log_file = open(path, "a", encoding="utf-8", buffering=1)
+                    self._log_path = path
+                self._log_file.write(line)
+        except OSError:
+            self.count_error("request_log")
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            snap = {
+                "uptime": round(time.time() - self.started, 1),
+                "stages": {name: self.stages[name].snapshot()
+                           for name in list(STAGES) + sorted(set(self.stages) - set(STAGES))},
+                "responses": [{"route": r, "model": m, "status": s, "count": c}
+                              for (r, m, s), c in sorted(self.responses.items())],
+                "bytes": {route: {"sent": v[0], "received": v[1]} for route, v in sorted(self.bytes.items())},
+                "pollen_spend": {m: round(v, 6) for m, v in sorted(self.spend.items())},
+                "errors": dict(self.errors),
+                "coalesced": dict(self.coalesced),
+                "hedging": dict(self.hedges, hedge_win_rate=round(self.hedges["hedge_won"] / self.hedges["fired"], 4)
+                                if self.hedges["fired"] else 0.0),
+            }
+        snap["caches"] = _cache_stats()
+        snap["keys"] = _key_stats()
+        return snap
+
+    def prometheus(self) -> str:
+        lines = []
+
+        def metric(name, kind, help_text):
+            lines.append(f"# HELP pollinations_{name} {help_text}")
+            lines.append(f"# TYPE pollinations_{name} {kind}")
+
+        def labels(**values):
+            return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in values.items()) + "}"
+
+        with self._lock:
+            metric("stage_seconds", "histogram", "Time spent per pipeline stage.")
+            for stage, h in sorted(self.stages.items()):
+                for bound, seen in zip(h.buckets, h.cumulative()):
+                    lines.append(f"pollinations_stage_seconds_bucket{labels(stage=stage, le=bound)} {seen}")
+                lines.append(f"pollinations_stage_seconds_bucket{labels(stage=stage, le='+Inf')} {h.count}")
+                lines.append(f"pollinations_stage_seconds_sum{labels(stage=stage)} {h.sum:.6f}")
+                lines.append(f"pollinations_stage_seconds_count{labels(stage=stage)} {h.count}")
+            metric("responses_total", "counter", "API responses per route, model and status (per attempt).")
+            for (route, model, status), count in sorted(self.responses.items()):
+                lines.append(f"pollinations_responses_total{labels(route=route, model=model, status=status)} {count}")
+            metric("bytes_total", "counter", "Bytes transferred per route and direction.")
+            for route, (sent, received) in sorted(self.bytes.items()):
+                lines.append(f"pollinations_bytes_total{labels(route=route, direction='sent')} {sent}")
+                lines.append(f"pollinations_bytes_total{labels(route=route, direction='received')} {received}")
+            metric("pollen_spend_total", "counter", "Estimated Pollen spent per model.")
+            for model, pollen in sorted(self.spend.items()):
+                lines.append(f"pollinations_pollen_spend_total{labels(model=model)} {pollen:.6f}")
+            metric("swallowed_errors_total", "counter", "Failures handled without failing the node.")
+            for where, count in sorted(self.errors.items()):
+                lines.append(f"pollinations_swallowed_errors_total{labels(where=where)} {count}")
+            metric("coalesced_total", "counter", "Calls served by an identical request already in flight.")
+            for group, count in sorted(self.coalesced.items()):
+                lines.append(f"pollinations_coalesced_total{labels(group=group)} {count}")
+            metric("hedges_total", "counter", "Hedged image requests by outcome.")
+            for outcome, count in sorted(self.hedges.items()):
+                lines.append(f"pollinations_hedges_total{labels(outcome=outcome)} {count}")
+        metric("cache_lookups_total", "counter", "Local cache lookups per cache and result.")
+        for name, stats in sorted(_cache_stats().items()):
+            for key, value in sorted(stats.items()):
+                if key.endswith("hits") or key == "misses":
+                    lines.append(f"pollinations_cache_lookups_total{labels(cache=name, result=key)} {value}")
+        keys = _key_stats()
+        if keys:
+            metric("key_in_flight", "gauge", "Requests in flight per pooled API key.")
+            for k in keys:
+                lines.append(f"pollinations_key_in_flight{labels(key=k['id'])} {k['in_flight']}")
+            metric("key_responses_total", "counter", "Responses per pooled API key and status.")
+            for k in keys:
+                for status, count in sorted(k["statuses"].items()):
+                    lines.append(f"pollinations_key_responses_total{labels(key=k['id'], status=status)} {count}")
+            metric("key_balance", "gauge", "Last known Pollen balance per pooled API key.")
+            for k in keys:
+                if k["balance"] is not None:
+                    lines.append(f"pollinations_key_balance{labels(key=k['id'])} {k['balance']}")
+            metric("key_drained", "gauge", "1 while a pooled API key is drained.")
+            for k in keys:
+                lines.append(f"pollinations_key_drained{labels(key=k['id'])} {int(k['drained'])}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _key_stats():
+    try:
+        from .pollinations_keypool import key_pool_stats
+    except ImportError:  # executed as a standalone script
+        from pollinations_keypool import key_pool_stats
+    return key_pool_stats()
+
+
+def _cache_stats() -> Dict[str, Dict[str, Any]]:
+    try:
+        from .pollinations_cache import cache_stats
+    except ImportError:  # executed as a standalone script
+        from pollinations_cache import cache_stats
+    return cache_stats()
+
+
+def estimate_pollen(kind: str, model: str, units: float = 1.0, prompt_tokens: int = 0,
+                    completion_tokens: int = 0) -> float:
+    """
+    Rough Pollen cost of one generation.
+
+    Uses "pollen_per_request" from the metrics config if the model is listed
+    there, otherwise the model's "pricing" from models_index.json: per-token
+    prices for text, a per-item price (times `units`) for the other kinds.
+    """
+    configured = get_section("metrics").get("pollen_per_request") or {}
+    if model in configured:
+        return float(configured[model]) * units
+    try:
+        from .pollinations_catalog import get_catalog
+    except ImportError:  # executed as a standalone script
+        from pollinations_catalog import get_catalog
+    pricing = (get_catalog().model_info(model, kind) or {}).get("pricing") or {}
+
+    def price(name):
+        try:
+            return float(pricing.get(name) or 0)
+        except (TypeError, ValueError):
+            return 0.0
+
+    if kind == "text":
+        return prompt_tokens * price("promptTextTokens") + completion_tokens * price("completionTextTokens")
+    field = {"image": "completionImageTokens", "video": "completionVideoSeconds",
+             "audio": "completionAudioSeconds"}.get(kind)
+    return units * price(field) if field else 0.0
+
+
+def record_generation(kind: str, url: str):
+    """Add the estimated cost of one image / audio / video generated from `url` to the metrics."""
+    model = model_of(url)
+    units = 1.0
+    if kind == "video":
+        try:
+            units = float(urllib.parse.parse_qs(urllib.parse.urlsplit(url).query).get("duration", ["1"])[0])
+        except ValueError:
+            pass
+    get_metrics().record_spend(model, estimate_pollen(kind, model, units))
+
+
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    return _metrics
@@ -1,46 +1,76 @@
 import urllib.parse
-import requests
-import torch
-import numpy as np
-from PIL import Image
-import io
-import json
+import asyncio
 import os
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from server import PromptServer
 from aiohttp import web
+from .pollinations_async import async_node
+from .pollinations_scheduler import PollinationsError, scheduled_request
+from .pollinations_cache import get_image_cache, get_text_cache, make_key, tensor_digest
+from .pollinations_catalog import get_catalog, startup_report, timed_input_types
+from .pollinations_config import CONFIG_PATH, get_config_store, get_section
+from .pollinations_hedge import get_hedge_settings, get_latency_tracker, hedge_delay, hedged_call
+from .pollinations_http import base_url
+from .pollinations_journal import ReplayUnavailable, get_journal
+from .pollinations_keypool import get_key_pool
+from .pollinations_metrics import get_metrics, model_of, record_generation, route_of
+from .pollinations_singleflight import get_flight
+from .pollinations_text import chat_completion, stream_chat_completion
 
 # SILENCE LOGGERS
 logging.getLogger("requests").setLevel(logging.CRITICAL)
 logging.getLogger("urllib3").setLevel(logging.CRITICAL)
 
+# torch / numpy / PIL are imported on first use only: the Text, Audio and Video
+# nodes never need them and they dominate the extension's import time.
+
+STREAM_PUSH_INTERVAL = 0.1
+DETERMINISTIC_SEED = 42
+GEN_BASE_URL = base_url("gen")
+
 # --- CONFIGURATION HANDLERS ---
 
 def get_config_path():
-    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "pollinations_config.json")
+    return CONFIG_PATH
 
 def get_models():
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    json_path = os.path.join(current_dir, "models.json")
-    try:
-        if os.path.exists(json_path):
-            with open(json_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-    except: pass
-    return {"image": ["flux"], "video": ["wan"], "text": ["openai"], "audio": ["elevenlabs"]}
+    return get_catalog().models()
+
+def resolve_model(model, kind):
+    return get_catalog().resolve(model, kind)
 
 def get_api_key(manual_key):
-    if manual_key and manual_key.strip() != "":
-        return manual_key.strip()
-    config_path = get_config_path()
-    if os.path.exists(config_path):
-        try:
-            with open(config_path, 'r') as f:
-                config = json.load(f)
-                key = config.get("api_key")
-                if key: return key.strip()
-        except: pass
-    return os.environ.get("POLLINATIONS_API_KEY", "")
+    # Manual key, then the "api_keys" pool, then the saved key, then the environment
+    with get_metrics().timed("key_lookup"):
+        if manual_key and manual_key.strip() != "":
+            return manual_key.strip()
+        pool = get_key_pool()
+        if pool is not None:
+            return pool.pick()
+        key = get_config_store().get("api_key")
+        if key and isinstance(key, str) and key.strip(): return key.strip()
+        return os.environ.get("POLLINATIONS_API_KEY", "")
+
+def auth_identity(api_key):
+    # Coalescing scope of a key: every pooled key serves the same accounts, so they are interchangeable
+    pool = get_key_pool()
+    return "pool" if pool is not None and pool.owns(api_key) else api_key
+
+def output_linked(dynprompt, node_id, index):
+    # True when another node of the running prompt takes output `index` of node_id as an input
+    if dynprompt is None or node_id is None:
+        return False
+    for other in dynprompt.all_node_ids():
+        for value in (dynprompt.get_node(other).get("inputs") or {}).values():
+            if isinstance(value, list) and len(value) == 2 and str(value[0]) == str(node_id) and value[1] == index:
+                return True
+    return False
+
+# Pick up hand edits of pollinations_config.json without a restart
+get_config_store().start_watching()
 
 # --- SERVER API ROUTE FOR SETTINGS ---
 
@@ -48,32 +78,214 @@ def get_api_key(manual_key):
 async def save_pollinations_key(request):
     json_data = await request.json()
     api_key = json_data.get("api_key")
-    config_path = get_config_path()
     try:
-        with open(config_path, 'w') as f:
-            json.dump({"api_key": api_key}, f)
+        get_config_store().update(api_key=api_key)
         return web.json_response({"status": "success"})
     except Exception as e:
         return web.json_response({"status": "error", "message": str(e)}, status=500)
 
-# --- IMAGE UPLOADER ---
+@PromptServer.instance.routes.get("/pollinations/metrics")
+async def pollinations_metrics(request):
+    # JSON by default; Prometheus text exposition with ?format=prometheus
+    if request.query.get("format") == "prometheus":
+        return web.Response(text=get_metrics().prometheus(), content_type="text/plain", charset="utf-8")
+    return web.json_response(get_metrics().snapshot())
 
-def upload_to_pollinations(image_tensor):
+@PromptServer.instance.routes.get("/pollinations/journal")
+async def pollinations_journal(request):
+    return web.json_response(get_journal().summary())
+
+@PromptServer.instance.routes.post("/pollinations/journal/resume")
+async def pollinations_journal_resume(request):
+    # Re-issues pending/failed journal entries in the background; progress shows up in GET /pollinations/journal
+    try:
+        json_data = await request.json()
+    except Exception:
+        json_data = {}
+    journal = get_journal()
+    if not journal.settings()["enabled"]:
+        return web.json_response({"status": "error", "message": "journal.enabled is off"}, status=400)
+    if journal.resume_status.get("running"):
+        return web.json_response({"status": "error", "message": "a resume is already running"}, status=409)
+    def run():
+        try:
+            summary = journal.resume(json_data.get("kinds"), bool(json_data.get("include_failed", True)), json_data.get("limit"))
+            print(f"[Pollinations] Journal resume: {summary}")
+        except Exception as e:
+            print(f"[Pollinations] Journal resume failed: {e}")
+    threading.Thread(target=run, name="pollinations-journal-resume", daemon=True).start()
+    return web.json_response({"status": "started"}, status=202)
+
+@PromptServer.instance.routes.post("/pollinations/refresh_models")
+async def pollinations_refresh_models(request):
+    # Runtime refresh of models.json / models_index.json; no README or git side effects
+    from .pollinations_auto_updater import refresh_catalog
+    summary = await asyncio.get_running_loop().run_in_executor(None, refresh_catalog, False)
+    if summary is None:
+        return web.json_response({"status": "error", "message": "Pollinations API unreachable"}, status=502)
+    return web.json_response(dict(summary, status="success"))
+
+@PromptServer.instance.routes.get("/pollinations/startup")
+async def pollinations_startup_report(request):
+    return web.json_response(startup_report())
+
+# --- BYOP DEVICE LOGIN ---
+
+_device_login = None
+
+def get_device_login():
+    global _device_login
+    if _device_login is None:
+        from .byop_auth import DeviceLoginManager
+        def save_token(api_key, user_info):
+            username = user_info.get('name', user_info.get('preferred_username', 'Unknown'))
+            get_config_store().update(api_key=api_key, byop_username=username)
+        def notify(status, owner):
+            # The user code binds an account to this server: only the client that started the login sees it
+            if owner:
+                PromptServer.instance.send_sync("pollinations.byop", status, sid=owner)
+        _device_login = DeviceLoginManager(on_token=save_token, on_status=notify)
+    return _device_login
+
+@PromptServer.instance.routes.post("/pollinations/byop/start")
+async def pollinations_byop_start(request):
     try:
-        i = 255. * image_tensor.cpu().numpy().squeeze()
-        img = Image.fromarray(np.clip(i, 0, 255).astype(np.uint8))
-        buffered = io.BytesIO()
-        img.save(buffered, format="PNG")
-        resp = requests.post("https://media.pollinations.ai/upload", 
-                             files={"file": ("image.png", buffered.getvalue(), "image/png")})
-        if resp.status_code == 200: return resp.json().get("url")
-    except: pass
-    return None
+        json_data = await request.json()
+    except Exception:
+        json_data = {}
+    try:
+        status = await get_device_login().start((json_data.get("app_key") or "").strip() or None,
+                                                owner=json_data.get("client_id") or None)
+        return web.json_response(status)
+    except Exception as e:
+        return web.json_response({"state": "error", "error": str(e)}, status=502)
+
+@PromptServer.instance.routes.get("/pollinations/byop/status")
+async def pollinations_byop_status(request):
+    return web.json_response(get_device_login().status(request.rel_url.query.get("client_id")))
+
+# --- IMAGE GENERATION ---
+
+def upload_to_pollinations(image_tensor):
+    from .pollinations_upload import upload_to_pollinations as upload
+    return upload(image_tensor)
+
+def lazy_upload(image_input):
+    """Returns a callable that uploads image_input at most once (thread-safe) and returns its URL."""
+    lock = threading.Lock()
+    result = []
+    def get_url():
+        with lock:
+            if not result:
+                try: result.append((upload_to_pollinations(image_input), None))
+                except Exception as e: result.append((None, e))
+        url, error = result[0]
+        if error is not None: raise error
+        return url
+    return get_url
+
+def image_cache_key(prompt, model, width, height, seed, negative_prompt, image_digest):
+    return make_key(kind="image", prompt=prompt.replace("\n", " ").strip(), model=model, width=width, height=height,
+                    seed=seed, negative_prompt=negative_prompt.strip(), image=image_digest)
+
+def fetch_image(prompt, model, width, height, seed, final_key, negative_prompt="", image_digest=None, get_image_url=None, use_cache=True, progress=None):
+    """Generates (or loads from cache) one image. Returns (IMAGE tensor, url); raises on failure."""
+    params = {"prompt": prompt, "model": model, "width": width, "height": height, "seed": seed,
+              "negative_prompt": negative_prompt, "image": image_digest, "use_cache": use_cache}
+    with get_journal().track("image", params) as entry:
+        if get_image_url is not None and entry.journal is not None:
+            # Remember the uploaded input image so the request can be re-issued without the tensor
+            get_upload = get_image_url
+            def get_image_url():
+                url = get_upload()
+                entry.note(image_url=url)
+                return url
+        args = (prompt, model, width, height, seed, final_key, negative_prompt, image_digest, get_image_url, use_cache, progress)
+        # Identical requests in flight at the same time share one download (random seeds never do)
+        if seed == -1 or (get_image_url is not None and image_digest is None):
+            result = _fetch_image(*args)
+        else:
+            flight_key = make_key(kind="image", prompt=prompt, model=model, width=width, height=height, seed=seed,
+                                  negative_prompt=negative_prompt, image=image_digest, auth=auth_identity(final_key), use_cache=use_cache)
+            result = get_flight("image").do(flight_key, lambda: _fetch_image(*args))
+        if entry.journal is not None and use_cache and seed != -1:
+            cache_key = image_cache_key(prompt, resolve_model(model, "image"), width, height, seed, negative_prompt, image_digest)
+            entry.set_result(cache_key=cache_key, path=get_image_cache().stored_path(cache_key))
+        entry.set_result(url=result[1])
+        return result
+
+def _fetch_image(prompt, model, width, height, seed, final_key, negative_prompt, image_digest, get_image_url, use_cache, progress):
+    from .pollinations_image import decode_to_tensor
+    model = resolve_model(model, "image")
+    clean_prompt = prompt.replace("\n", " ").strip()
+    clean_negative = negative_prompt.strip()
+    max_side = int(get_section("image").get("decode_max_side", 0))
+    # Random seeds (-1) never repeat, so they are never cached
+    cache_key = None
+    if use_cache and seed != -1:
+        cache_key = image_cache_key(prompt, model, width, height, seed, negative_prompt, image_digest)
+        cached_path = get_image_cache().get_path(cache_key)
+        if cached_path:
+            try:
+                cached_url = get_image_cache().get_meta(cache_key).get("url", "")
+                return (decode_to_tensor(cached_path, max_side), cached_url)
+            except Exception: get_metrics().count_error("image_cache_read")
+    img_url = get_image_url() if get_image_url is not None else None
+    def image_url(m):
+        url = f"{GEN_BASE_URL}/image/{urllib.parse.quote(clean_prompt)}?model={m}&width={width}&height={height}&seed={seed}&nologo=true"
+        if img_url: url += f"&image={urllib.parse.quote(img_url)}"
+        if clean_negative: url += f"&negative_prompt={urllib.parse.quote(clean_negative)}"
+        return url
+    url = image_url(model)
+    headers = {}
+    if final_key: headers["Authorization"] = f"Bearer {final_key}"
+    hedge = get_hedge_settings()
+    if not hedge["enabled"]:
+        return (download_image(url, headers, max_side, cache_key, progress=progress), url)
+
+    # Hedging: past the model's percentile deadline, race a second request (optionally on a fallback model)
+    hedge_url = image_url(resolve_model(hedge["fallback_model"], "image")) if hedge["fallback_model"] else url
+
+    def run_hedge(cancel):
+        # The key is picked only once the hedge fires: a pick reserves load on that key
+        hedge_headers = headers
+        pool = get_key_pool()
+        if pool is not None and pool.owns(final_key) and pool.has_alternative(final_key):
+            hedge_headers = {"Authorization": f"Bearer {pool.pick(exclude=final_key)}"}
+        return (download_image(hedge_url, hedge_headers, max_side, cache_key if hedge_url == url else None, cancel),
+                hedge_url)
+
+    return hedged_call(lambda cancel: (download_image(url, headers, max_side, cache_key, cancel, progress), url),
+                       run_hedge, hedge_delay(model, hedge))
+
+def download_image(url, headers, max_side, cache_key=None, cancel=None, progress=None):
+    """
+    GET and decode one image (caching the encoded bytes under cache_key); records the model's latency.
+    progress: optional DownloadProgress fed with every received chunk.
+    """
+    from .pollinations_image import borrow_buffer, decode_to_tensor, read_response
+    metrics = get_metrics()
+    start = time.perf_counter()
+    with borrow_buffer() as buf:
+        with scheduled_request("GET", url, budget="image", headers=headers, stream=True) as r, metrics.timed("download"):
+            try:
+                body = read_response(r, buf, cancel, progress)
+            finally:
+                metrics.add_bytes(route_of(url), received=r.raw.tell())
+        record_generation("image", url)
+        image = decode_to_tensor(body, max_side)
+        if cache_key:
+            try: get_image_cache().put(cache_key, body, meta={"url": url})
+            except Exception: metrics.count_error("image_cache_write")
+    get_latency_tracker().record(model_of(url), time.perf_counter() - start)
+    return image
 
 # --- NODE CLASSES ---
 
+@async_node
 class PollinationsImageGen:
     @classmethod
+    @timed_input_types
     def INPUT_TYPES(s):
         model_data = get_models()
         return {
@@ -87,35 +299,112 @@ class PollinationsImageGen:
             "optional": {
                 "api_key": ("STRING", {"default": "", "multiline": False, "placeholder": "Optional: Overrides Global Settings"}),
                 "image_input": ("IMAGE",),
-                "negative_prompt": ("STRING", {"multiline": True, "default": ""})
-            }
+                "negative_prompt": ("STRING", {"multiline": True, "default": ""}),
+                "use_cache": ("BOOLEAN", {"default": True, "label_on": "Local Cache", "label_off": "Bypass Cache"})
+            },
+            "hidden": {"unique_id": "UNIQUE_ID"}
         }
     RETURN_TYPES = ("IMAGE", "STRING")
     RETURN_NAMES = ("image", "url")
     FUNCTION = "generate"
     CATEGORY = "Pollinations/Image"
 
-    def generate(self, prompt, model, width, height, seed, api_key="", image_input=None, negative_prompt=""):
+    def generate(self, prompt, model, width, height, seed, api_key="", image_input=None, negative_prompt="", use_cache=True, unique_id=None):
+        from .pollinations_image import DownloadProgress
         final_key = get_api_key(api_key)
-        model = model.replace("💎", "").strip()
-        encoded_prompt = urllib.parse.quote(prompt.replace("\n", " ").strip())
-        url = f"https://gen.pollinations.ai/image/{encoded_prompt}?model={model}&width={width}&height={height}&seed={seed}&nologo=true"
+        image_digest, get_image_url = None, None
         if image_input is not None:
-            img_url = upload_to_pollinations(image_input)
-            if img_url: url += f"&image={urllib.parse.quote(img_url)}"
-        if negative_prompt.strip(): url += f"&negative_prompt={urllib.parse.quote(negative_prompt.strip())}"
-        headers = {"User-Agent": "Mozilla/5.0"}
-        if final_key: headers["Authorization"] = f"Bearer {final_key}"
-        try:
-            r = requests.get(url, headers=headers, timeout=120)
-            if r.status_code == 200:
-                img = Image.open(io.BytesIO(r.content)).convert("RGB")
-                return (torch.from_numpy(np.array(img).astype(np.float32) / 255.0)[None,], url)
-        except: pass
-        return (torch.zeros((1, 512, 512, 3)), url)
+            image_digest = tensor_digest(image_input)
+            get_image_url = lazy_upload(image_input)
+        # Download progress and a downscaled preview of the partial image on the node
+        settings = get_section("image")
+        progress = DownloadProgress(unique_id, int(settings.get("preview_size", 512)),
+                                    float(settings.get("preview_interval", 0.5)))
+        return fetch_image(prompt, model, width, height, seed, final_key, negative_prompt,
+                           image_digest, get_image_url, use_cache, progress)
 
+@async_node
+class PollinationsImageBatchGen:
+    """
+    Fans many prompts and/or a seed range out over a thread pool and returns
+    one stacked IMAGE batch plus the URL list, both in input order.
+    Failed items are reported in `errors` instead of being replaced by placeholders.
+    """
+    @classmethod
+    @timed_input_types
+    def INPUT_TYPES(s):
+        model_data = get_models()
+        return {
+            "required": {
+                "prompts": ("STRING", {"multiline": True, "default": "a cat in space\na dog in space"}),
+                "model": (model_data["image"], {"default": "flux"}),
+                "width": ("INT", {"default": 1024, "min": 256, "max": 4096, "step": 8}),
+                "height": ("INT", {"default": 1024, "min": 256, "max": 4096, "step": 8}),
+                "seed_start": ("INT", {"default": 42, "min": -1, "max": 2147483647}),
+                "seed_count": ("INT", {"default": 1, "min": 1, "max": 256}),
+                "max_concurrency": ("INT", {"default": 4, "min": 1, "max": 16}),
+            },
+            "optional": {
+                "api_key": ("STRING", {"default": "", "multiline": False, "placeholder": "Optional: Overrides Global Settings"}),
+                "image_input": ("IMAGE",),
+                "negative_prompt": ("STRING", {"multiline": True, "default": ""}),
+                "use_cache": ("BOOLEAN", {"default": True, "label_on": "Local Cache", "label_off": "Bypass Cache"})
+            }
+        }
+    RETURN_TYPES = ("IMAGE", "STRING", "STRING")
+    RETURN_NAMES = ("images", "urls", "errors")
+    FUNCTION = "generate"
+    CATEGORY = "Pollinations/Image"
+
+    def generate(self, prompts, model, width, height, seed_start, seed_count, max_concurrency,
+                 api_key="", image_input=None, negative_prompt="", use_cache=True):
+        final_key = get_api_key(api_key)
+        prompt_list = [p.strip() for p in prompts.splitlines() if p.strip()]
+        if not prompt_list:
+            raise ValueError("Pollinations batch: no prompts given (one prompt per line)")
+        # seed -1 stays random for every item
+        seeds = [-1] * seed_count if seed_start == -1 else [seed_start + i for i in range(seed_count)]
+        jobs = [(p, sd) for p in prompt_list for sd in seeds]
+
+        image_digest, get_image_url = None, None
+        if image_input is not None:
+            image_digest = tensor_digest(image_input)
+            get_image_url = lazy_upload(image_input)
+
+        def run(job):
+            return fetch_image(job[0], model, width, height, job[1], final_key, negative_prompt,
+                               image_digest, get_image_url, use_cache)
+
+        results = [None] * len(jobs)
+        errors = []
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(jobs))) as pool:
+            futures = {pool.submit(run, job): i for i, job in enumerate(jobs)}
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    errors.append((i, f"#{i} seed={jobs[i][1]} prompt={jobs[i][0][:60]!r}: {e}"))
+
+        done = [r for r in results if r is not None]
+        error_text = "\n".join(msg for _, msg in sorted(errors))
+        if not done:
+            raise RuntimeError(f"Pollinations batch: all {len(jobs)} requests failed\n{error_text}")
+        import torch
+        # Models may ignore the requested size; match everything to the first result
+        h, w = done[0][0].shape[1:3]
+        images = []
+        for image, _ in done:
+            if image.shape[1:3] != (h, w):
+                image = torch.nn.functional.interpolate(image.movedim(-1, 1), size=(h, w), mode="bilinear").movedim(1, -1)
+            images.append(image)
+        urls = "\n".join(url for _, url in done)
+        return (torch.cat(images, dim=0), urls, error_text)
+
+@async_node
 class PollinationsAudioGen:
     @classmethod
+    @timed_input_types
     def INPUT_TYPES(s):
         model_data = get_models()
         return {
@@ -124,22 +413,36 @@ class PollinationsAudioGen:
                 "model": (model_data["audio"], {"default": "elevenlabs"}),
                 "voice": (["alloy", "echo", "fable", "onyx", "nova", "shimmer", "sarah", "rachel", "charlie"], {"default": "sarah"}),
             },
-            "optional": {"api_key": ("STRING", {"default": ""})}
+            "optional": {
+                "api_key": ("STRING", {"default": ""}),
+                "fetch_audio": ("BOOLEAN", {"default": False, "label_on": "Download & Decode", "label_off": "URL Only"}),
+                "use_cache": ("BOOLEAN", {"default": True, "label_on": "Local Cache", "label_off": "Bypass Cache"}),
+            },
+            "hidden": {"unique_id": "UNIQUE_ID", "dynprompt": "DYNPROMPT"}
         }
-    RETURN_TYPES = ("STRING",)
-    RETURN_NAMES = ("audio_url",)
+    RETURN_TYPES = ("STRING", "AUDIO")
+    RETURN_NAMES = ("audio_url", "audio")
     FUNCTION = "generate"
     CATEGORY = "Pollinations/Audio"
 
-    def generate(self, text, model, voice, api_key=""):
+    def generate(self, text, model, voice, api_key="", fetch_audio=False, use_cache=True, unique_id=None, dynprompt=None):
+        if not fetch_audio and output_linked(dynprompt, unique_id, 1):
+            raise ValueError("Pollinations Audio: the 'audio' output is only produced with fetch_audio enabled "
+                             "(URL Only mode returns just audio_url)")
         final_key = get_api_key(api_key)
-        model = model.replace("💎", "").strip()
-        url = f"https://gen.pollinations.ai/audio/{urllib.parse.quote(text.strip())}?model={model}&voice={voice}"
-        if final_key: url += f"&key={final_key}"
-        return (url,)
+        model = resolve_model(model, "audio")
+        url = f"{GEN_BASE_URL}/audio/{urllib.parse.quote(text.strip())}?model={model}&voice={voice}"
+        if not fetch_audio:
+            # URL-only mode: downstream consumers fetch it themselves and need the key inline
+            if final_key: url += f"&key={final_key}"
+            return (url, None)
+        from .pollinations_audio import decode_audio
+        return (url, decode_audio(fetch_audio_file(url, text, model, voice, final_key, use_cache)))
 
+@async_node
 class PollinationsVideoGen:
     @classmethod
+    @timed_input_types
     def INPUT_TYPES(s):
         model_data = get_models()
         return {
@@ -152,25 +455,72 @@ class PollinationsVideoGen:
                 "image_input": ("IMAGE",),
                 "duration": ("INT", {"default": 5, "min": 2, "max": 15}),
                 "seed": ("INT", {"default": 42, "min": -1, "max": 2147483647}),
-            }
+                "download": ("BOOLEAN", {"default": False, "label_on": "Download MP4", "label_off": "URL Only"}),
+                "use_cache": ("BOOLEAN", {"default": True, "label_on": "Local Cache", "label_off": "Bypass Cache"}),
+                "extract_frames": ("BOOLEAN", {"default": False, "label_on": "Output Frames", "label_off": "No Frames"}),
+                "frame_stride": ("INT", {"default": 1, "min": 1, "max": 120}),
+                "max_frames": ("INT", {"default": 64, "min": 1, "max": 2048}),
+            },
+            "hidden": {"unique_id": "UNIQUE_ID", "dynprompt": "DYNPROMPT"}
         }
-    RETURN_TYPES = ("STRING",)
-    RETURN_NAMES = ("video_url",)
+    RETURN_TYPES = ("STRING", "STRING", "IMAGE")
+    RETURN_NAMES = ("video_url", "video_path", "frames")
     FUNCTION = "generate"
     CATEGORY = "Pollinations/Video"
 
-    def generate(self, prompt, model, api_key="", image_input=None, duration=5, seed=42):
+    def generate(self, prompt, model, api_key="", image_input=None, duration=5, seed=42, download=False,
+                 use_cache=True, extract_frames=False, frame_stride=1, max_frames=64, unique_id=None, dynprompt=None):
+        if not (download or extract_frames) and output_linked(dynprompt, unique_id, 1):
+            raise ValueError("Pollinations Video: the 'video_path' output is only produced with download "
+                             "or extract_frames enabled (URL Only mode returns just video_url)")
+        if not extract_frames and output_linked(dynprompt, unique_id, 2):
+            raise ValueError("Pollinations Video: the 'frames' output is only produced with extract_frames enabled")
         final_key = get_api_key(api_key)
-        model = model.replace("💎", "").strip()
-        url = f"https://gen.pollinations.ai/video/{urllib.parse.quote(prompt.strip())}?model={model}&duration={duration}&seed={seed}"
+        model = resolve_model(model, "video")
+        url = f"{GEN_BASE_URL}/video/{urllib.parse.quote(prompt.strip())}?model={model}&duration={duration}&seed={seed}"
+        image_digest, img_url = None, None
         if image_input is not None:
+            image_digest = tensor_digest(image_input)
             img_url = upload_to_pollinations(image_input)
             if img_url: url += f"&image={urllib.parse.quote(img_url)}"
-        if final_key: url += f"&key={final_key}"
-        return (url,)
+        if not (download or extract_frames):
+            # URL-only mode: downstream consumers fetch it themselves and need the key inline
+            if final_key: url += f"&key={final_key}"
+            return (url, "", None)
+        from .pollinations_video import extract_frames as decode_frames
+        path = fetch_video_file(url, prompt, model, duration, seed, final_key, image_digest, img_url, use_cache)
+        frames = decode_frames(path, frame_stride, max_frames) if extract_frames else None
+        return (url, path, frames)
 
+def fetch_audio_file(url, text, model, voice, final_key, use_cache=True):
+    """Downloads (or finds in the audio cache) one generated clip; returns its path."""
+    from .pollinations_audio import download_audio
+    headers = {}
+    if final_key: headers["Authorization"] = f"Bearer {final_key}"
+    cache_key = make_key(kind="audio", text=text.strip(), model=model, voice=voice)
+    with get_journal().track("audio", {"text": text.strip(), "model": model, "voice": voice}) as entry:
+        path = download_audio(url, headers, cache_key, use_cache)
+        entry.set_result(cache_key=cache_key, path=path)
+    return path
+
+def fetch_video_file(url, prompt, model, duration, seed, final_key, image_digest=None, img_url=None, use_cache=True):
+    """Downloads (or finds in the video cache) one generated MP4; returns its path."""
+    from .pollinations_video import download_video
+    headers = {}
+    if final_key: headers["Authorization"] = f"Bearer {final_key}"
+    cache_key = make_key(kind="video", prompt=prompt.strip(), model=model, duration=duration, seed=seed, image=image_digest)
+    params = {"prompt": prompt.strip(), "model": model, "duration": duration, "seed": seed,
+              "image": image_digest, "image_url": img_url}
+    with get_journal().track("video", params) as entry:
+        # Random seeds (-1) never repeat, so they are never served from the cache or resumed
+        path = download_video(url, headers, cache_key, use_cache and seed != -1, resumable=seed != -1)
+        entry.set_result(cache_key=cache_key, path=path)
+    return path
+
+@async_node
 class PollinationsTextGen:
     @classmethod
+    @timed_input_types
     def INPUT_TYPES(s):
         model_data = get_models()
         return {
@@ -179,23 +529,67 @@ class PollinationsTextGen:
                 "model": (model_data["text"], {"default": "openai"}),
                 "system_instruction": ("STRING", {"multiline": True, "default": "You are a helpful assistant."}),
             },
-            "optional": {"api_key": ("STRING", {"default": ""})}
+            "optional": {
+                "api_key": ("STRING", {"default": ""}),
+                "stream": ("BOOLEAN", {"default": False, "label_on": "Stream", "label_off": "Wait for full reply"}),
+                "use_cache": ("BOOLEAN", {"default": False, "label_on": "Cache Replies", "label_off": "No Cache"}),
+                "deterministic": ("BOOLEAN", {"default": False, "label_on": "Fixed Seed/Temperature", "label_off": "Model Defaults"}),
+            },
+            "hidden": {"unique_id": "UNIQUE_ID"}
         }
     RETURN_TYPES = ("STRING",)
     FUNCTION = "generate"
     CATEGORY = "Pollinations/Text"
 
-    def generate(self, prompt, model, system_instruction, api_key=""):
+    def generate(self, prompt, model, system_instruction, api_key="", stream=False, use_cache=False, deterministic=False, unique_id=None):
         final_key = get_api_key(api_key)
-        model = model.replace("💎", "").strip()
-        url = "https://gen.pollinations.ai/v1/chat/completions"
+        model = resolve_model(model, "text")
         headers = {"Content-Type": "application/json"}
         if final_key: headers["Authorization"] = f"Bearer {final_key}"
         payload = {"model": model, "messages": [{"role": "system", "content": system_instruction}, {"role": "user", "content": prompt}]}
+        # Fixed sampling makes a cached reply a valid answer for the same payload
+        if deterministic: payload.update(temperature=0, seed=DETERMINISTIC_SEED)
+        cache_key = make_key(kind="text", payload=payload) if use_cache else None
+        params = {"prompt": prompt, "model": model, "system_instruction": system_instruction,
+                  "deterministic": deterministic, "stream": stream}
+        with get_journal().track("text", params) as entry:
+            entry.set_result(cache_key=cache_key)
+            text = get_text_cache().get(cache_key) if cache_key else None
+            if text is None:
+                # Identical payloads in flight at the same time share one completion
+                flight_key = make_key(kind="text", payload=payload, stream=stream, auth=auth_identity(final_key))
+                if not stream:
+                    text = get_flight("text").do(flight_key, lambda: chat_completion(payload, headers))
+                else:
+                    text = self.stream_reply(payload, headers, flight_key, model, unique_id)
+                if cache_key: get_text_cache().set(cache_key, text)
+            entry.set_result(chars=len(text))
+        return (text,)
+
+    def stream_reply(self, payload, headers, flight_key, model, unique_id):
+        # Partial text is pushed at most every STREAM_PUSH_INTERVAL seconds, only to the client that
+        # queued the prompt (on a shared server a broadcast would show the reply to everyone)
+        sid = PromptServer.instance.client_id
+        pending, last_push = [], [0.0]
+        def push(delta):
+            pending.append(delta)
+            now = time.perf_counter()
+            if now - last_push[0] >= STREAM_PUSH_INTERVAL:
+                PromptServer.instance.send_sync("pollinations.text.stream", {"node": unique_id, "delta": "".join(pending)}, sid=sid)
+                pending.clear()
+                last_push[0] = now
+
+        PromptServer.instance.send_sync("pollinations.text.stream", {"node": unique_id, "start": True}, sid=sid)
         try:
-            r = requests.post(url, json=payload, headers=headers)
-            return (r.json()["choices"][0]["message"]["content"],)
-        except: return ("Error connecting to Text API",)
+            # A coalesced caller gets no live deltas, only the final text
+            text, stats = get_flight("text").do(flight_key, lambda: stream_chat_completion(payload, headers, on_delta=push))
+        except PollinationsError as e:
+            PromptServer.instance.send_sync("pollinations.text.stream", {"node": unique_id, "done": True, "error": str(e)}, sid=sid)
+            raise
+        print(f"[Pollinations] Text stream ({model}): TTFT {stats['ttft']:.2f}s, "
+              f"{stats['tokens_per_sec']:.1f} tok/s ({stats['tokens']} tokens in {stats['total']:.1f}s)")
+        PromptServer.instance.send_sync("pollinations.text.stream", {"node": unique_id, "done": True, "text": text, "stats": stats}, sid=sid)
+        return text
 
 
 class PollinationsBYOPLogin:
@@ -205,6 +599,7 @@ class PollinationsBYOPLogin:
     Reference: https://github.com/pollinations/pollinations/blob/main/BRING_YOUR_OWN_POLLEN.md
     """
     @classmethod
+    @timed_input_types
     def INPUT_TYPES(s):
         return {
             "required": {
@@ -221,39 +616,67 @@ class PollinationsBYOPLogin:
     CATEGORY = "Pollinations/BYOP"
     OUTPUT_NODE = True
 
+    @classmethod
+    def IS_CHANGED(s, login_trigger, app_key=""):
+        # The result depends on the background device login, not on the inputs
+        return float("nan") if login_trigger else 0
+
     def login(self, login_trigger, app_key=""):
         # If not triggered, return empty values
         if not login_trigger:
             return ("", "", "", 0)
-        
+
         # Import here to avoid startup overhead
         from .byop_auth import BYOPAuth
-        
-        auth = BYOPAuth(app_key if app_key.strip() else None)
-        api_key = auth.authenticate_interactive()
-        
+
+        manager = get_device_login()
+        result = manager.result()
+        api_key = result[0] if result else get_config_store().get("api_key", "")
         if api_key:
-            # Get user info
-            user_info = auth.get_user_info(api_key)
+            # Already logged in (or a key is configured): report the account (user info is TTL-cached)
+            user_info = BYOPAuth(app_key.strip() or None).get_user_info(api_key)
             if user_info:
                 username = user_info.get('name', user_info.get('preferred_username', 'Unknown'))
-                email = user_info.get('email', '')
-                balance = user_info.get('balance', 0)
-                
-                # Save to config for other nodes
-                config_path = get_config_path()
-                try:
-                    config = {}
-                    if os.path.exists(config_path):
-                        with open(config_path, 'r') as f:
-                            config = json.load(f)
-                    config["api_key"] = api_key
-                    config["byop_username"] = username
-                    with open(config_path, 'w') as f:
-                        json.dump(config, f)
-                except Exception as e:
-                    print(f"[BYOP] Failed to save config: {e}")
-                
-                return (api_key, username, email, balance)
-        
-        return ("", "", "", 0)
\ No newline at end of file
+                return (api_key, username, user_info.get('email', ''), user_info.get('balance', 0))
+
+        # Start (or re-show) the device flow; polling runs on the server loop, so the queue keeps moving
+        status = asyncio.run_coroutine_threadsafe(manager.start(app_key.strip() or None, owner=PromptServer.instance.client_id),
+                                                  PromptServer.instance.loop).result(timeout=30)
+        if "user_code" in status:
+            print(f"\n🔐 BYOP: go to {status['verification_uri']} and enter code {status['user_code']}, then queue again.")
+        else:
+            print("\n🔐 BYOP: a login started by another client is waiting for approval; queue again later.")
+        return ("", "", "", 0)
+
+# --- JOURNAL RESUME ---
+# Re-issue journaled requests from their recorded parameters (with the current key: keys are never journaled).
+# Only requests whose result lands in a local cache are worth paying for again.
+
+def replay_image(p):
+    if p.get("seed") == -1:
+        raise ReplayUnavailable("random seed results are not cached")
+    if p.get("image") and not p.get("image_url"):
+        raise ReplayUnavailable("the input image was never uploaded")
+    get_image_url = (lambda: p["image_url"]) if p.get("image_url") else None
+    fetch_image(p["prompt"], p["model"], p["width"], p["height"], p["seed"], get_api_key(""),
+                p.get("negative_prompt", ""), p.get("image"), get_image_url, True)
+
+def replay_text(p):
+    PollinationsTextGen().generate(p["prompt"], p["model"], p["system_instruction"], use_cache=True,
+                                   deterministic=p.get("deterministic", False))
+
+def replay_audio(p):
+    url = f"{GEN_BASE_URL}/audio/{urllib.parse.quote(p['text'])}?model={p['model']}&voice={p['voice']}"
+    fetch_audio_file(url, p["text"], p["model"], p["voice"], get_api_key(""))
+
+def replay_video(p):
+    if p.get("seed") == -1:
+        raise ReplayUnavailable("random seed results are not cached")
+    if p.get("image") and not p.get("image_url"):
+        raise ReplayUnavailable("the input image was never uploaded")
+    url = f"{GEN_BASE_URL}/video/{urllib.parse.quote(p['prompt'])}?model={p['model']}&duration={p['duration']}&seed={p['seed']}"
+    if p.get("image_url"): url += f"&image={urllib.parse.quote(p['image_url'])}"
+    fetch_video_file(url, p["prompt"], p["model"], p["duration"], p["seed"], get_api_key(""), p.get("image"), p.get("image_url"))
+
+for _kind, _replayer in (("image", replay_image), ("text", replay_text), ("audio", replay_audio), ("video", replay_video)):
+    get_journal().register_replayer(_kind, _replayer)
@@ -0,0 +1,323 @@
+"""
+Client-side request scheduler shared by every Pollinations call
+(image, text, upload, model updater).
+
+Each request passes through:
+
+1. a token bucket per host and one per API key (rate limits),
+2. a global concurrency cap,
+3. a retry loop for 429/5xx and connection errors with exponential backoff,
+   full jitter and Retry-After support, bounded by a per-call budget
+   (max attempts + deadline).
+
+Failures surface as PollinationsError, which carries the HTTP status, the
+endpoint, the number of attempts and the server's message. A request made
+inside a set CancelToken's scope (see pollinations_http) raises
+RequestCancelled instead and is never retried.
+
+Tuned through the optional "scheduler" section of pollinations_config.json:
+
+    "scheduler": {
+        "host_rps": 10, "host_burst": 10,
+        "hosts": {"gen.pollinations.ai": {"rps": 2, "burst": 4}},
+        "key_rps": 0, "key_burst": 5,           # 0 = no per-key limit
+        "max_concurrency": 16,
+        "max_attempts": 4, "deadline": 300,
+        "backoff_base": 1.0, "backoff_max": 30,
+        "budgets": {"image": {"max_attempts": 3, "deadline": 240}}
+    }
+"""
+
+import email.utils
+import hashlib
+import random
+import threading
+import time
+import urllib.parse
+from typing import Any, Dict, Optional
+
+import requests
+
+try:
+    from .pollinations_config import get_section
+    from .pollinations_http import RequestCancelled, current_token, get_session
+    from .pollinations_keypool import DRAIN_STATUSES, get_key_pool
+    from .pollinations_metrics import get_metrics, model_of, route_of
+except ImportError:  # executed as a standalone script
+    from pollinations_config import get_section
+    from pollinations_http import RequestCancelled, current_token, get_session
+    from pollinations_keypool import DRAIN_STATUSES, get_key_pool
+    from pollinations_metrics import get_metrics, model_of, route_of
+
+RETRY_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+DEFAULT_SETTINGS = {
+    "host_rps": 10.0,
+    "host_burst": 10,
+    "hosts": {},
+    "key_rps": 0.0,
+    "key_burst": 5,
+    "max_concurrency": 16,
+    "max_attempts": 4,
+    "deadline": 300.0,
+    "backoff_base": 1.0,
+    "backoff_max": 30.0,
+    "budgets": {},
+}
+
+
+class PollinationsError(RuntimeError):
+    """A Pollinations request that failed for good (after retries, or with a non-retryable status)."""
+
+    def __init__(self, message: str, status: Optional[int] = None, endpoint: str = "",
+                 attempts: int = 0, retry_after: Optional[float] = None, detail: str = ""):
+        self.status = status
+        self.endpoint = endpoint
+        self.attempts = attempts
+        self.retry_after = retry_after
+        self.detail = detail
+        super().__init__(message)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"message": str(self), "status": self.status, "endpoint": self.endpoint,
+                "attempts": self.attempts, "retry_after": self.retry_after, "detail": self.detail}
+
+
+class TokenBucket:
+    """Token bucket with reservations: callers take a token and sleep for the returned wait."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def cancel(self):
+        """Return an unused reservation."""
+        with self._lock:
+            self.tokens = min(self.capacity, self.tokens + 1)
+
+
+def endpoint_of(url: str) -> str:
+    """host + shortened path, without the query string (which may hold a key)."""
+    parts = urllib.parse.urlsplit(url)
+    path = parts.path if len(parts.path) <= 48 else parts.path[:45] + "..."
+    return f"{parts.netloc}{path}"
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except Exception:
+        return None
+
+
+def api_key_of(url: str, headers: Optional[Dict[str, str]]) -> Optional[str]:
+    auth = (headers or {}).get("Authorization", "")
+    if auth.startswith("Bearer "):
+        return auth[7:]
+    key = urllib.parse.parse_qs(urllib.parse.urlsplit(url).query).get("key")
+    return key[0] if key else None
+
+
+class RequestScheduler:
+    """Rate limiting, concurrency cap and retries in front of the shared session."""
+
+    def __init__(self, settings: Optional[Dict[str, Any]] = None):
+        self.settings = dict(DEFAULT_SETTINGS)
+        self.settings.update(settings or {})
+        self._slots = threading.BoundedSemaphore(int(self.settings["max_concurrency"]))
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def budget(self, name: Optional[str]) -> Dict[str, float]:
+        limits = {"max_attempts": self.settings["max_attempts"], "deadline": self.settings["deadline"]}
+        limits.update((self.settings.get("budgets") or {}).get(name or "", {}))
+        return {"max_attempts": max(1, int(limits["max_attempts"])), "deadline": float(limits["deadline"])}
+
+    def _bucket(self, scope: str, rate: float, burst: int) -> Optional[TokenBucket]:
+        if not rate or rate <= 0:
+            return None
+        with self._lock:
+            bucket = self._buckets.get(scope)
+            if bucket is None:
+                bucket = self._buckets[scope] = TokenBucket(float(rate), int(burst))
+            return bucket
+
+    def _buckets_for(self, url: str, headers) -> list:
+        host = urllib.parse.urlsplit(url).netloc
+        host_cfg = (self.settings.get("hosts") or {}).get(host, {})
+        buckets = [self._bucket(f"host:{host}", host_cfg.get("rps", self.settings["host_rps"]),
+                                host_cfg.get("burst", self.settings["host_burst"]))]
+        key = api_key_of(url, headers)
+        if key:
+            digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+            buckets.append(self._bucket(f"key:{digest}", self.settings["key_rps"], self.settings["key_burst"]))
+        return [b for b in buckets if b is not None]
+
+    def _throttle(self, url: str, headers, deadline: float, endpoint: str, attempt: int):
+        buckets = self._buckets_for(url, headers)
+        waits = [b.reserve() for b in buckets]
+        wait = max(waits, default=0.0)
+        if time.monotonic() + wait > deadline:
+            for b in buckets:
+                b.cancel()
+            raise PollinationsError(f"Pollinations rate limit: {endpoint} would exceed the request deadline",
+                                    endpoint=endpoint, attempts=attempt - 1)
+        if wait > 0:
+            time.sleep(wait)
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        cap = min(float(self.settings["backoff_max"]), float(self.settings["backoff_base"]) * (2 ** (attempt - 1)))
+        delay = random.uniform(0, cap)
+        if retry_after is not None:
+            delay = retry_after + random.uniform(0, min(1.0, cap))
+        return delay
+
+    def request(self, method: str, url: str, budget: Optional[str] = None,
+                raise_for_status: bool = True, **kwargs) -> requests.Response:
+        """
+        Issue a request through the scheduler.
+
+        The concurrency slot is held until the response headers (or the whole
+        body, unless stream=True) have arrived. Every attempt is counted in
+        the metrics registry; the final outcome goes to the request log.
+
+        Raises:
+            PollinationsError once the budget is spent or on a non-retryable
+            error status (when raise_for_status is set).
+        """
+        started = time.perf_counter()
+        route, model = route_of(url), model_of(url, kwargs.get("json"))
+        try:
+            response, attempts = self._request(method, url, budget, raise_for_status, route, model, **kwargs)
+        except PollinationsError as e:
+            get_metrics().log_request({"method": method, "route": route, "model": model, "status": e.status,
+                                       "attempts": e.attempts, "elapsed": round(time.perf_counter() - started, 4),
+                                       "error": str(e)[:300]})
+            raise
+        get_metrics().log_request({"method": method, "route": route, "model": model,
+                                   "status": response.status_code, "attempts": attempts,
+                                   "ttfb": round(response.elapsed.total_seconds(), 4),
+                                   "elapsed": round(time.perf_counter() - started, 4)})
+        return response
+
+    def _request(self, method: str, url: str, budget: Optional[str], raise_for_status: bool,
+                 route: str, model: str, **kwargs):
+        limits = self.budget(budget)
+        deadline = time.monotonic() + limits["deadline"]
+        endpoint = endpoint_of(url)
+        metrics = get_metrics()
+        pool = get_key_pool()
+        token = current_token()
+        attempt = 0
+        while True:
+            attempt += 1
+            if token is not None and token.is_set():
+                raise RequestCancelled(f"request to {endpoint} cancelled")
+            self._throttle(url, kwargs.get("headers"), deadline, endpoint, attempt)
+            if not self._slots.acquire(timeout=max(0.0, deadline - time.monotonic())):
+                raise PollinationsError(f"Pollinations: no free request slot for {endpoint} before the deadline",
+                                        endpoint=endpoint, attempts=attempt - 1)
+            auth = (kwargs.get("headers") or {}).get("Authorization", "")
+            pooled_key = auth[7:] if pool is not None and auth.startswith("Bearer ") and pool.owns(auth[7:]) else None
+            if pooled_key:
+                pool.begin(pooled_key)
+            response, error = None, None
+            try:
+                response = get_session().request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if token is not None and token.is_set():
+                    # Our own socket shutdown (CancelToken.set), not a network failure: don't retry
+                    if pooled_key:
+                        pool.end(pooled_key, None)
+                    raise RequestCancelled(f"request to {endpoint} cancelled") from e
+                error = e
+            except BaseException:
+                if pooled_key:
+                    pool.end(pooled_key, None)
+                raise
+            finally:
+                self._slots.release()
+
+            status = response.status_code if response is not None else None
+            retry_after = parse_retry_after(response.headers.get("Retry-After")) if response is not None else None
+            metrics.record_response(route, model, status)
+            if response is not None:
+                metrics.observe("ttfb", response.elapsed.total_seconds())
+                body = response.request.body
+                metrics.add_bytes(route, sent=len(body) if isinstance(body, (bytes, str)) else 0,
+                                  received=0 if kwargs.get("stream") else len(response.content))
+            if pooled_key:
+                pool.end(pooled_key, status, retry_after)
+                # A key that was just drained (401/402/429) is swapped for another account right away
+                if status in DRAIN_STATUSES and attempt < limits["max_attempts"] and pool.has_alternative(pooled_key):
+                    kwargs["headers"] = dict(kwargs["headers"], Authorization=f"Bearer {pool.pick(exclude=pooled_key)}")
+                    response.close()
+                    continue
+            if response is not None and status not in RETRY_STATUSES:
+                if status >= 400 and raise_for_status:
+                    raise self._error(response, endpoint, attempt)
+                return response, attempt
+
+            delay = self._backoff(attempt, retry_after)
+            if attempt >= limits["max_attempts"] or time.monotonic() + delay > deadline:
+                if response is None:
+                    raise PollinationsError(f"Pollinations request to {endpoint} failed after {attempt} attempt(s): {error}",
+                                            endpoint=endpoint, attempts=attempt, detail=str(error)) from error
+                if not raise_for_status:
+                    return response, attempt
+                raise self._error(response, endpoint, attempt, retry_after)
+            if response is not None:
+                response.close()
+            if token is not None:
+                token.wait(delay)
+            else:
+                time.sleep(delay)
+
+    @staticmethod
+    def _error(response: requests.Response, endpoint: str, attempts: int,
+               retry_after: Optional[float] = None) -> PollinationsError:
+        try:
+            detail = response.text[:300].strip()
+        except Exception:
+            detail = ""
+        finally:
+            response.close()
+        return PollinationsError(f"Pollinations HTTP {response.status_code} from {endpoint} after {attempts} attempt(s)"
+                                 + (f": {detail}" if detail else ""),
+                                 status=response.status_code, endpoint=endpoint, attempts=attempts,
+                                 retry_after=retry_after, detail=detail)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> RequestScheduler:
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = RequestScheduler(get_section("scheduler"))
+    return _scheduler
+
+
+def scheduled_request(method: str, url: str, budget: Optional[str] = None, **kwargs) -> requests.Response:
+    """Shortcut for get_scheduler().request(...)."""
+    return get_scheduler().request(method, url, budget=budget, **kwargs)
@@ -0,0 +1,80 @@
+"""
+Single-flight coalescing of identical in-flight requests.
+
+When several nodes of one graph (or several queued prompts on a multi-user
+server) ask for the same image, text payload or upload at the same moment,
+only the first caller (the leader) performs the call; the others wait for it
+and receive the same result, or the same exception. Nothing is remembered
+once the call has finished: this complements the result caches, it does not
+replace them.
+
+Results are shared, not copied, so callers must treat them as read-only
+(ComfyUI never mutates node outputs in place).
+"""
+
+import threading
+from typing import Any, Callable, Dict
+
+try:
+    from .pollinations_metrics import get_metrics
+except ImportError:  # executed as a standalone script
+    from pollinations_metrics import get_metrics
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Thread-safe call coalescing by key."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Run fn() unless a call with the same key is in flight; then wait for its outcome."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if not leader:
+            get_metrics().count_coalesced(self.name)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+
+_flights: Dict[str, SingleFlight] = {}
+_flights_lock = threading.Lock()
+
+
+def get_flight(name: str) -> SingleFlight:
+    """The process-wide SingleFlight group for one kind of request ("image", "text", "upload", "video")."""
+    with _flights_lock:
+        flight = _flights.get(name)
+        if flight is None:
+            flight = _flights[name] = SingleFlight(name)
+        return flight
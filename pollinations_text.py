@@ -0,0 +1,145 @@
+"""
+Chat-completion helpers for PollinationsTextGen.
+
+stream_chat_completion() reads the OpenAI-compatible SSE stream of
+/v1/chat/completions incrementally, hands text deltas to a callback as they
+arrive and enforces three limits:
+
+- connect timeout: TCP/TLS setup,
+- idle timeout:    maximum silence between two received chunks,
+- total timeout:   wall-clock budget for the whole completion.
+
+Limits come from the optional "text" section of pollinations_config.json:
+
+    "text": {"connect_timeout": 10, "idle_timeout": 60, "total_timeout": 300}
+"""
+
+import json
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import requests
+
+try:
+    from .pollinations_config import get_section
+    from .pollinations_http import base_url
+    from .pollinations_metrics import estimate_pollen, get_metrics, route_of
+    from .pollinations_scheduler import PollinationsError, endpoint_of, scheduled_request
+except ImportError:  # executed as a standalone script
+    from pollinations_config import get_section
+    from pollinations_http import base_url
+    from pollinations_metrics import estimate_pollen, get_metrics, route_of
+    from pollinations_scheduler import PollinationsError, endpoint_of, scheduled_request
+
+CHAT_URL = f"{base_url('gen')}/v1/chat/completions"
+
+DEFAULT_TIMEOUTS = {"connect_timeout": 10.0, "idle_timeout": 60.0, "total_timeout": 300.0}
+
+
+def get_text_timeouts() -> Dict[str, float]:
+    timeouts = dict(DEFAULT_TIMEOUTS)
+    timeouts.update({k: float(v) for k, v in get_section("text").items() if k in DEFAULT_TIMEOUTS})
+    return timeouts
+
+
+def record_usage(model: str, usage: Optional[Dict[str, Any]], completion_tokens: int = 0):
+    """Add the estimated Pollen cost of one completion to the metrics."""
+    usage = usage or {}
+    pollen = estimate_pollen("text", model, prompt_tokens=int(usage.get("prompt_tokens") or 0),
+                             completion_tokens=int(usage.get("completion_tokens") or completion_tokens))
+    get_metrics().record_spend(model, pollen)
+
+
+def chat_completion(payload: Dict[str, Any], headers: Dict[str, str]) -> str:
+    """Blocking (non-streamed) completion, bounded by connect and total timeouts."""
+    t = get_text_timeouts()
+    r = scheduled_request("POST", CHAT_URL, budget="text", json=payload, headers=headers,
+                          timeout=(t["connect_timeout"], t["total_timeout"]))
+    try:
+        reply = r.json()
+        text = reply["choices"][0]["message"]["content"]
+    except (ValueError, KeyError, IndexError, TypeError) as e:
+        raise PollinationsError(f"Pollinations text reply from {endpoint_of(CHAT_URL)} was malformed: {e}",
+                                status=r.status_code, endpoint=endpoint_of(CHAT_URL), attempts=1) from e
+    record_usage(payload.get("model", ""), reply.get("usage"))
+    return text
+
+
+def iter_sse_data(response, deadline: float, total_timeout: float):
+    """Yield the parsed JSON of every `data:` event until [DONE] or the end of the stream."""
+    pending = b""
+    for data in response.iter_content(chunk_size=None):
+        if time.perf_counter() > deadline:
+            raise TimeoutError(f"exceeded total timeout of {total_timeout:.0f}s")
+        pending += data
+        lines = pending.split(b"\n")
+        pending = lines.pop()
+        for line in lines:
+            line = line.strip()
+            if not line.startswith(b"data:"):
+                continue  # blank separators, ": keep-alive" comments, event names
+            event = line[5:].strip()
+            if event == b"[DONE]":
+                return
+            try:
+                message = json.loads(event)
+            except ValueError:
+                continue
+            yield message
+
+
+def stream_chat_completion(payload: Dict[str, Any], headers: Dict[str, str],
+                           on_delta: Optional[Callable[[str], None]] = None) -> Tuple[str, Dict[str, float]]:
+    """
+    Streamed completion.
+
+    Returns:
+        (full_text, stats) where stats holds ttft (seconds to first token),
+        tokens, tokens_per_sec and total (seconds).
+
+    Raises:
+        PollinationsError on HTTP errors (after scheduler retries), idle or
+        total timeouts and broken streams.
+    """
+    t = get_text_timeouts()
+    body = dict(payload, stream=True, stream_options={"include_usage": True})
+    endpoint = endpoint_of(CHAT_URL)
+    start = time.perf_counter()
+    deadline = start + t["total_timeout"]
+    first_token_at = None
+    parts, chunks, usage = [], 0, None
+
+    with scheduled_request("POST", CHAT_URL, budget="text", json=body, headers=headers, stream=True,
+                           timeout=(t["connect_timeout"], t["idle_timeout"])) as r:
+        try:
+            for message in iter_sse_data(r, deadline, t["total_timeout"]):
+                if message.get("usage"):
+                    usage = message["usage"]
+                for choice in message.get("choices") or []:
+                    delta = (choice.get("delta") or {}).get("content")
+                    if not delta:
+                        continue
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    chunks += 1
+                    parts.append(delta)
+                    if on_delta:
+                        on_delta(delta)
+        except (requests.RequestException, TimeoutError) as e:
+            raise PollinationsError(f"Pollinations text stream from {endpoint} broke off: {e}",
+                                    status=r.status_code, endpoint=endpoint, attempts=1, detail=str(e)) from e
+        finally:
+            get_metrics().add_bytes(route_of(CHAT_URL), received=r.raw.tell())
+
+    total = time.perf_counter() - start
+    tokens = (usage or {}).get("completion_tokens") or chunks
+    record_usage(payload.get("model", ""), usage, completion_tokens=chunks)
+    ttft = (first_token_at - start) if first_token_at else total
+    generation_time = total - ttft
+    stats = {
+        "ttft": round(ttft, 3),
+        "tokens": tokens,
+        "tokens_per_sec": round(tokens / generation_time, 2) if generation_time > 0 else 0.0,
+        "total": round(total, 3),
+    }
+    return "".join(parts), stats
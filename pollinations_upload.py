@@ -0,0 +1,108 @@
+"""
+Input-image uploader for the Image and Video nodes.
+
+Every frame of an IMAGE batch is hashed, and the hash -> URL mapping is kept
+in a persistent store with an expiry, so an identical reference image is
+never re-encoded or re-uploaded while its URL is still valid.
+
+The upload encoding is configurable through the optional "upload" section of
+pollinations_config.json:
+
+    "upload": {"format": "png-fast", "jpeg_quality": 92, "url_ttl_hours": 24}
+
+Formats: "png-fast" (zlib level 1, default), "png" (PIL default level),
+"webp-lossless" and "jpeg" (quality-bounded, smallest payload).
+"""
+
+import io
+from typing import List, Tuple
+
+import torch
+from PIL import Image
+
+from .pollinations_cache import get_upload_store, tensor_digest
+from .pollinations_config import get_section
+from .pollinations_http import base_url
+from .pollinations_metrics import get_metrics
+from .pollinations_scheduler import PollinationsError, endpoint_of, scheduled_request
+from .pollinations_singleflight import get_flight
+
+UPLOAD_URL = f"{base_url('media')}/upload"
+
+FORMATS = {
+    # name: (PIL format, save kwargs, extension, mime)
+    "png-fast": ("PNG", {"compress_level": 1}, "png", "image/png"),
+    "png": ("PNG", {}, "png", "image/png"),
+    "webp-lossless": ("WEBP", {"lossless": True, "method": 0}, "webp", "image/webp"),
+    "jpeg": ("JPEG", {"optimize": False}, "jpg", "image/jpeg"),
+}
+
+
+def get_upload_settings() -> Tuple[str, int, float]:
+    settings = get_section("upload")
+    fmt = settings.get("format", "png-fast")
+    if fmt not in FORMATS:
+        fmt = "png-fast"
+    quality = min(max(int(settings.get("jpeg_quality", 92)), 1), 100)
+    ttl = float(settings.get("url_ttl_hours", 24)) * 3600
+    return fmt, quality, ttl
+
+
+def encode_frame(frame, fmt: str, quality: int) -> Tuple[bytes, str, str]:
+    """Encode one HxWxC float frame (0..1) to (payload, filename, mime)."""
+    pixels = frame.detach().cpu().mul(255).clamp_(0, 255).to(torch.uint8).numpy()
+    if pixels.shape[-1] == 1:
+        pixels = pixels[..., 0]
+    pil_format, options, ext, mime = FORMATS[fmt]
+    if pil_format == "JPEG":
+        options = dict(options, quality=quality)
+    img = Image.fromarray(pixels)
+    if pil_format == "JPEG" and img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    buffered = io.BytesIO()
+    img.save(buffered, format=pil_format, **options)
+    return buffered.getvalue(), f"image.{ext}", mime
+
+
+def upload_frame(frame, fmt: str, quality: int, ttl: float) -> str:
+    store = get_upload_store()
+    key = f"{fmt}:{quality if fmt == 'jpeg' else ''}:{tensor_digest(frame)}"
+    url = store.get(key)
+    if url:
+        return url
+    # The same frame uploaded concurrently (e.g. by several nodes) is sent only once
+    return get_flight("upload").do(key, lambda: _upload_frame(store, key, frame, fmt, quality, ttl))
+
+
+def _upload_frame(store, key: str, frame, fmt: str, quality: int, ttl: float) -> str:
+    metrics = get_metrics()
+    with metrics.timed("upload_encode"):
+        payload, filename, mime = encode_frame(frame, fmt, quality)
+    with metrics.timed("upload_post"):
+        resp = scheduled_request("POST", UPLOAD_URL, budget="upload", files={"file": (filename, payload, mime)})
+    try:
+        url = resp.json().get("url")
+    except ValueError:
+        url = None
+    if not url:
+        raise PollinationsError("Pollinations upload returned no URL", status=resp.status_code,
+                                endpoint=endpoint_of(UPLOAD_URL), attempts=1)
+    store.set(key, url, ttl)
+    return url
+
+
+def upload_images(image_tensor) -> List[str]:
+    """Upload every frame of an IMAGE tensor ([B,H,W,C] or [H,W,C]); returns URLs in batch order."""
+    fmt, quality, ttl = get_upload_settings()
+    frames = image_tensor if image_tensor.dim() == 4 else image_tensor[None,]
+    return [upload_frame(frame, fmt, quality, ttl) for frame in frames]
+
+
+def upload_to_pollinations(image_tensor) -> str:
+    """
+    Upload an IMAGE batch; returns a comma-separated URL list (the API's multi-image form).
+
+    Raises PollinationsError if an upload fails, so an image-to-image request
+    never silently degrades into a text-only one.
+    """
+    return ",".join(upload_images(image_tensor))
@@ -0,0 +1,149 @@
+"""
+Video download and frame extraction for PollinationsVideoGen.
+
+download_video() streams the MP4 to disk in chunks. If the transfer breaks,
+the next attempt resumes from the bytes already on disk with an HTTP Range
+request (falling back to a fresh download if the server ignores Range), and
+the final size is verified against Content-Length / Content-Range before the
+file is moved into the video DiskCache. Only fixed-seed requests resume:
+they share one partial file per cache key and are serialized on it, while a
+random-seed (-1) request gets a new video on every call, so it downloads into
+its own partial file and restarts from zero instead of splicing two videos.
+
+extract_frames() decodes incrementally with PyAV and keeps only every
+`stride`-th frame, up to `max_frames`, so a long clip is never held in memory
+as a full float32 frame stack.
+"""
+
+import os
+import re
+import time
+import uuid
+from typing import Dict, Optional
+
+import requests
+
+from .pollinations_cache import get_video_cache
+from .pollinations_metrics import get_metrics, record_generation, route_of
+from .pollinations_scheduler import PollinationsError, endpoint_of, scheduled_request
+from .pollinations_singleflight import get_flight
+
+CHUNK_SIZE = 1024 * 1024
+MAX_RESUMES = 5
+# Frame buffer size when the container does not report its frame count; grows by doubling
+INITIAL_FRAMES = 16
+
+
+def _expected_size(response, offset: int) -> Optional[int]:
+    content_range = response.headers.get("Content-Range", "")
+    match = re.match(r"bytes \d+-\d+/(\d+)", content_range)
+    if match:
+        return int(match.group(1))
+    length = response.headers.get("Content-Length")
+    if length and length.isdigit():
+        return int(length) + (offset if response.status_code == 206 else 0)
+    return None
+
+
+def download_video(url: str, headers: Dict[str, str], cache_key: str, use_cache: bool = True,
+                   resumable: bool = True) -> str:
+    """
+    Path of the MP4 in the video cache. resumable=False (random seeds) never
+    reuses bytes from an earlier response; otherwise identical downloads are
+    coalesced and a broken transfer resumes with a Range request.
+    """
+    cache = get_video_cache()
+    if use_cache:
+        path = cache.get_path(cache_key)
+        if path:
+            return path
+    if not resumable:
+        part = f"{cache.partial_path(cache_key)}.{uuid.uuid4().hex}"
+        try:
+            return _download(url, headers, cache_key, part, resumable=False)
+        finally:
+            if os.path.exists(part):
+                os.remove(part)
+    # One download per key at a time: concurrent callers wait and share its file
+    return get_flight("video").do(
+        cache_key, lambda: _download(url, headers, cache_key, cache.partial_path(cache_key), resumable=True))
+
+
+def _download(url: str, headers: Dict[str, str], cache_key: str, part: str, resumable: bool) -> str:
+    cache = get_video_cache()
+    endpoint = endpoint_of(url)
+    metrics, route, start = get_metrics(), route_of(url), time.perf_counter()
+    last_error = None
+    for _ in range(MAX_RESUMES + 1):
+        offset = os.path.getsize(part) if resumable and os.path.exists(part) else 0
+        request_headers = dict(headers)
+        if offset:
+            request_headers["Range"] = f"bytes={offset}-"
+        try:
+            with scheduled_request("GET", url, budget="video", headers=request_headers, stream=True,
+                                   raise_for_status=False) as r:
+                if r.status_code == 416:
+                    # Nothing left to fetch past our offset: the partial file is stale, start over
+                    os.remove(part)
+                    continue
+                if r.status_code not in (200, 206):
+                    raise PollinationsError(f"Pollinations HTTP {r.status_code} from {endpoint}",
+                                            status=r.status_code, endpoint=endpoint, attempts=1)
+                if r.status_code == 200:
+                    offset = 0  # server ignored Range
+                expected = _expected_size(r, offset)
+                try:
+                    with open(part, 'ab' if offset else 'wb') as f:
+                        for chunk in r.iter_content(CHUNK_SIZE):
+                            f.write(chunk)
+                finally:
+                    metrics.add_bytes(route, received=r.raw.tell())
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+            last_error = e
+            continue
+        size = os.path.getsize(part)
+        if expected is not None and size != expected:
+            last_error = f"received {size} of {expected} bytes"
+            if size > expected:
+                os.remove(part)
+            continue
+        metrics.observe("download", time.perf_counter() - start)
+        record_generation("video", url)
+        return cache.put_file(cache_key, part, meta={"url": url.split("?")[0], "bytes": size})
+    raise PollinationsError(f"Pollinations video download from {endpoint} failed after {MAX_RESUMES + 1} attempts: {last_error}",
+                            endpoint=endpoint, attempts=MAX_RESUMES + 1, detail=str(last_error))
+
+
+def extract_frames(path: str, stride: int = 1, max_frames: int = 64):
+    """Decode every `stride`-th frame (at most max_frames) into a [N, H, W, 3] float32 IMAGE tensor."""
+    import av
+    import torch
+
+    stride = max(1, stride)
+    out = None
+    count = 0
+    with av.open(path) as container:
+        stream = container.streams.video[0]
+        stream.thread_type = "AUTO"
+        for index, frame in enumerate(container.decode(stream)):
+            if index % stride:
+                continue
+            if out is None:
+                # Sized from the reported frame count (or small when unknown); each kept frame is
+                # converted straight into it
+                capacity = -(-stream.frames // stride) if stream.frames else INITIAL_FRAMES
+                out = torch.empty((max(1, min(capacity, max_frames)), frame.height, frame.width, 3),
+                                  dtype=torch.float32)
+            if count == out.shape[0]:
+                # More frames than expected: grow, bounded by max_frames
+                grown = torch.empty((min(max_frames, out.shape[0] * 2),) + tuple(out.shape[1:]), dtype=torch.float32)
+                grown[:count] = out
+                out = grown
+            torch.div(torch.from_numpy(frame.to_ndarray(format="rgb24")), 255.0, out=out[count])
+            count += 1
+            if count >= max_frames:
+                break
+    if not count:
+        raise ValueError(f"No video frames decoded from {path}")
+    # A slice would keep the whole over-sized buffer alive downstream
+    return out if count == out.shape[0] else out[:count].clone()
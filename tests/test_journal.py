@@ -0,0 +1,38 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pollinations_journal import RESUMABLE, JournalEntry, fold  # noqa: E402
+
+
+class _Recorder:
+    def __init__(self):
+        self.records = []
+
+    def append(self, record):
+        self.records.append(record)
+
+
+class FoldTest(unittest.TestCase):
+    def test_note_keeps_entry_resumable(self):
+        recorder = _Recorder()
+        pending = {"id": "a", "event": "pending", "kind": "image", "params": {"prompt": "cat"}}
+        JournalEntry(recorder, "a").note(image_url="https://example.invalid/x.png")
+        entry = fold([pending] + recorder.records)["a"]
+        self.assertEqual(entry["status"], "pending")
+        self.assertIn(entry["status"], RESUMABLE)
+        self.assertEqual(entry["params"], {"prompt": "cat", "image_url": "https://example.invalid/x.png"})
+
+    def test_completed_after_note(self):
+        records = [
+            {"id": "a", "event": "pending", "kind": "image", "params": {}},
+            {"id": "a", "params": {"image_url": "u"}},
+            {"id": "a", "event": "completed", "elapsed": 1.0},
+        ]
+        self.assertEqual(fold(records)["a"]["status"], "completed")
+
+
+if __name__ == "__main__":
+    unittest.main()